@@ -0,0 +1,232 @@
+# Benchmarks the Kingdom Hearts World Importer on synthetic worlds
+# run it with blender in background mode, no gpu is needed:
+# blender -b --factory-startup --python "Blender Importer Benchmark.py" -- [options]
+
+import bpy
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import argparse
+import tempfile
+import statistics
+import importlib.util
+import numpy as np
+
+IS_OPAQUE = 1
+IS_ALPHA = 2
+IS_ALPHA_ADD = 4
+IS_ALPHA_SUBTRACT = 8
+
+# name: (groups, meshes per group, vertices per mesh, textures, texture size, fraction of alpha meshes, cutout mode, bob groups)
+SCENARIOS = {
+    "small": (2, 20, 64, 4, 64, 0.3, 'DETECT', 1),
+    "many_alpha_meshes": (4, 250, 256, 8, 64, 1.0, 'ALWAYS', 0),
+    "large_textures_detect": (2, 16, 64, 8, 2048, 0.0, 'DETECT', 0),
+    "many_meshes_per_group": (1, 3000, 24, 16, 32, 0.2, 'ALWAYS', 0),
+}
+
+
+def load_importer():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Blender Importer.py")
+    spec = importlib.util.spec_from_file_location("kh_world_importer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_png(path: str, pixels: np.ndarray):
+    # minimal rgba png writer so worlds can be generated without touching bpy.data
+    height, width, _ = pixels.shape
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    # every row starts with filter type 0
+    rows = np.concatenate((np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, width * 4)), axis=1)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 1)))
+        f.write(chunk(b"IEND", b""))
+
+
+def floats(values: np.ndarray) -> str:
+    return " ".join(np.char.mod("%g", values.ravel()))
+
+
+def write_world(directory: str, world_id: str, groups: int, meshes: int, vertices: int, textures: int, texture_size: int, alpha_ratio: float, bob_groups: int, seed: int = 0):
+    """Writes a world in the layout produced by Kh2MapStudio's World Meshes (Sliced Textures) export"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    for texture_index in range(textures):
+        pixels = rng.integers(0, 256, (texture_size, texture_size, 4), dtype=np.uint8)
+        # odd textures are cutout, even textures are fully opaque which is the worst case for cutout detection
+        pixels[:, :, 3] = 255
+        if texture_index % 2 == 1:
+            pixels[::4, ::4, 3] = 0
+        write_png(os.path.join(directory, f"{world_id}-texture{texture_index}.png"), pixels)
+
+    geometries = []
+    nodes = []
+    texture_info_lines = []
+    wrap_modes = ("Wrap", "Clamp")
+    alpha_flags_choices = (IS_ALPHA, IS_ALPHA | IS_ALPHA_ADD, IS_ALPHA | IS_ALPHA_SUBTRACT)
+    for group_index in range(groups + bob_groups):
+        is_bob = group_index >= groups
+        prefix = f"BOB {group_index - groups}" if is_bob else f"Group {group_index}"
+        child_nodes = []
+        for mesh_index in range(meshes):
+            mesh_id = f"mesh_{group_index}_{mesh_index}"
+            name = f"{prefix} Mesh {mesh_index}"
+            # a strip of triangles, every vertex is duplicated once so the nudge has coincident positions to weld
+            positions = rng.random((vertices // 2, 3), dtype=np.float32) * 1000 + np.array([group_index * 1000, mesh_index * 10, 0], dtype=np.float32)
+            positions = np.repeat(positions, 2, axis=0)
+            vertex_count = len(positions)
+            uvs = np.concatenate((rng.random((vertex_count, 2), dtype=np.float32) * 2, np.ones((vertex_count, 1), dtype=np.float32)), axis=1)
+            alpha_uvs = np.zeros((vertex_count, 3), dtype=np.float32)
+            alpha_uvs[:, 0] = rng.random(vertex_count, dtype=np.float32)
+            colours = rng.random((vertex_count, 4), dtype=np.float32)
+            triangles = np.stack((np.arange(vertex_count - 2), np.arange(1, vertex_count - 1), np.arange(2, vertex_count)), axis=1)
+            geometries.append(f"""<geometry id="{mesh_id}" name="{name}"><mesh>
+<source id="{mesh_id}-positions"><float_array id="{mesh_id}-positions-array" count="{vertex_count * 3}">{floats(positions)}</float_array>
+<technique_common><accessor count="{vertex_count}" source="#{mesh_id}-positions-array" stride="3"/></technique_common></source>
+<source id="{mesh_id}-tex0"><float_array id="{mesh_id}-tex0-array" count="{vertex_count * 3}">{floats(uvs)}</float_array>
+<technique_common><accessor count="{vertex_count}" source="#{mesh_id}-tex0-array" stride="3"/></technique_common></source>
+<source id="{mesh_id}-tex1"><float_array id="{mesh_id}-tex1-array" count="{vertex_count * 3}">{floats(alpha_uvs)}</float_array>
+<technique_common><accessor count="{vertex_count}" source="#{mesh_id}-tex1-array" stride="3"/></technique_common></source>
+<source id="{mesh_id}-color0"><float_array id="{mesh_id}-color0-array" count="{vertex_count * 4}">{floats(colours)}</float_array>
+<technique_common><accessor count="{vertex_count}" source="#{mesh_id}-color0-array" stride="4"/></technique_common></source>
+<vertices id="{mesh_id}-vertices"><input semantic="POSITION" source="#{mesh_id}-positions"/></vertices>
+<triangles count="{len(triangles)}" material="defaultMaterial">
+<input offset="0" semantic="VERTEX" source="#{mesh_id}-vertices"/>
+<input offset="0" semantic="COLOR" source="#{mesh_id}-color0" set="0"/>
+<input offset="0" semantic="TEXCOORD" source="#{mesh_id}-tex0" set="0"/>
+<input offset="0" semantic="TEXCOORD" source="#{mesh_id}-tex1" set="1"/>
+<p>{" ".join(np.char.mod("%d", triangles.ravel()))}</p>
+</triangles></mesh></geometry>""")
+            child_nodes.append(f"""<node id="{mesh_id}-node" name="{name}"><matrix sid="matrix">1 0 0 0 0 1 0 0 0 0 1 0 0 0 0 1</matrix><instance_geometry url="#{mesh_id}"/></node>""")
+
+            alpha_flags = IS_OPAQUE if rng.random() >= alpha_ratio else int(rng.choice(alpha_flags_choices))
+            texture_index = int(rng.integers(0, textures))
+            wrap_u, wrap_v = wrap_modes[int(rng.integers(0, 2))], wrap_modes[int(rng.integers(0, 2))]
+            texture_info_lines.append(f"{group_index},{mesh_index}:{world_id}-texture{texture_index}:{alpha_flags}:-1:0:{wrap_u},{wrap_v}")
+
+        group_name = f"{group_index} BOB {group_index - groups}" if is_bob else f"{group_index} Mesh Group {group_index}"
+        translation = f"1 0 0 {group_index * 100} 0 1 0 0 0 0 1 0 0 0 0 1" if is_bob else "1 0 0 0 0 1 0 0 0 0 1 0 0 0 0 1"
+        nodes.append(f"""<node id="group_{group_index}" name="{group_name}"><matrix sid="matrix">{translation}</matrix>{"".join(child_nodes)}</node>""")
+
+    with open(os.path.join(directory, f"{world_id}-world.dae"), "w") as f:
+        f.write(f"""<?xml version="1.0" encoding="utf-8"?>
+<COLLADA xmlns="http://www.collada.org/2005/11/COLLADASchema" version="1.4.1">
+<asset><unit name="meter" meter="1"/><up_axis>Y_UP</up_axis></asset>
+<library_geometries>{"".join(geometries)}</library_geometries>
+<library_visual_scenes><visual_scene id="scene" name="scene">{"".join(nodes)}</visual_scene></library_visual_scenes>
+<scene><instance_visual_scene url="#scene"/></scene>
+</COLLADA>
+""")
+    texture_info_path = os.path.join(directory, f"{world_id}-preSliced-texture-info.txt")
+    with open(texture_info_path, "w") as f:
+        f.write("\n".join(texture_info_lines) + "\n")
+    return texture_info_path
+
+
+def run_scenario(importer_module, texture_info_path: str, options, repeats: int) -> dict:
+    def report(level: set[str], message: str):
+        if 'ERROR' in level or 'WARNING' in level:
+            print(f"{'/'.join(sorted(level))}: {message}")
+
+    runs = []
+    profiles = []
+    for _ in range(repeats):
+        # every run starts from an empty file so earlier runs can not be reused
+        bpy.ops.wm.read_homefile(use_empty=True)
+        importer = importer_module.WorldImporter(options, report)
+        start_time = time.perf_counter()
+        result = importer.import_world(bpy.context, texture_info_path, bpy.context.scene.collection)
+        runs.append(time.perf_counter() - start_time)
+        if 'FINISHED' not in result:
+            raise RuntimeError(f"Importing {texture_info_path} failed")
+        profiles.append(importer.profile)
+
+    phases = {name: min(profile.phases.get(name, 0.0) for profile in profiles) for name in profiles[0].phases}
+    return {"seconds": min(runs), "median_seconds": statistics.median(runs), "runs": runs, "phases": phases, "counters": profiles[0].counters}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Prints the change against a baseline, returns False if any scenario got slower than the threshold allows"""
+    passed = True
+    for name, result in results["scenarios"].items():
+        if name not in baseline.get("scenarios", {}):
+            print(f"{name}: no baseline")
+            continue
+        baseline_result = baseline["scenarios"][name]
+        ratio = result["seconds"] / baseline_result["seconds"] if baseline_result["seconds"] > 0 else 1.0
+        status = "ok" if ratio <= threshold else "REGRESSION"
+        passed = passed and ratio <= threshold
+        print(f"{name}: {baseline_result['seconds']:.3f}s -> {result['seconds']:.3f}s ({ratio:.2f}x) {status}")
+        for phase, seconds in result["phases"].items():
+            baseline_seconds = baseline_result["phases"].get(phase)
+            if baseline_seconds:
+                print(f"    {phase}: {baseline_seconds:.3f}s -> {seconds:.3f}s ({seconds / baseline_seconds:.2f}x)")
+    return passed
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='blender -b --factory-startup --python "Blender Importer Benchmark.py" --', description="Benchmark the KH world importer on synthetic worlds")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="scenario to run, can be repeated, runs every scenario by default")
+    parser.add_argument("--custom", nargs=8, metavar=("GROUPS", "MESHES", "VERTICES", "TEXTURES", "TEXTURE_SIZE", "ALPHA_RATIO", "CUTOUT_MODE", "BOB_GROUPS"), help="run one scenario with these parameters instead")
+    parser.add_argument("--work-dir", help="directory the synthetic worlds are written to, a temporary directory by default")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per scenario, the fastest run is reported")
+    parser.add_argument("--warm", action="store_true", help="keep the importer's sidecar caches between runs instead of measuring cold imports")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE", help="override an importer setting, can be repeated")
+    parser.add_argument("--results", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare the results against this json file")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline to this json file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown against the baseline that counts as a regression")
+    args = parser.parse_args(argv)
+
+    importer_module = load_importer()
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="kh-importer-benchmark-")
+    if args.custom is not None:
+        groups, meshes, vertices, textures, texture_size, alpha_ratio, cutout_mode, bob_groups = args.custom
+        scenarios = {"custom": (int(groups), int(meshes), int(vertices), int(textures), int(texture_size), float(alpha_ratio), cutout_mode, int(bob_groups))}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+
+    results = {"blender": bpy.app.version_string, "warm": args.warm, "scenarios": {}}
+    for name, (groups, meshes, vertices, textures, texture_size, alpha_ratio, cutout_mode, bob_groups) in scenarios.items():
+        directory = os.path.join(work_dir, name)
+        print(f"{name}: generating {groups} groups and {bob_groups} bob groups of {meshes} meshes with {vertices} vertices, {textures} {texture_size}x{texture_size} textures")
+        texture_info_path = write_world(directory, name, groups, meshes, vertices, textures, texture_size, alpha_ratio, bob_groups)
+
+        options = importer_module.default_import_options()
+        options.cutout_mode = cutout_mode
+        options.cache_texture_info = args.warm
+        options.cache_geometry = args.warm
+        for option in args.option:
+            option_name, value = option.split("=", 1)
+            default = getattr(options, option_name)
+            setattr(options, option_name, value.lower() in ("1", "true", "yes", "on") if isinstance(default, bool) else type(default)(value))
+
+        result = run_scenario(importer_module, texture_info_path, options, args.repeats)
+        result["params"] = {"groups": groups, "meshes": meshes, "vertices": vertices, "textures": textures, "texture_size": texture_size, "alpha_ratio": alpha_ratio, "cutout_mode": cutout_mode, "bob_groups": bob_groups}
+        results["scenarios"][name] = result
+        print(f"{name}: {result['seconds']:.3f}s ({', '.join(f'{phase} {seconds:.3f}s' for phase, seconds in result['phases'].items())})")
+
+    for path in (args.results, args.save_baseline):
+        if path is not None:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []))
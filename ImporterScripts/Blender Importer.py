@@ -6,7 +6,22 @@ bl_info = {
 
 import bpy
 import os
+import re
+import sys
+import json
+import hashlib
+import math
+import time
+import struct
+import types
+import contextlib
+import concurrent.futures
+import argparse
+import traceback
+import xml.etree.ElementTree as ET
 import numpy as np
+from mathutils import Matrix
+from mathutils.kdtree import KDTree
 
 # ImportHelper is a helper class, defines filename and
 # invoke() function which calls the file selector.
@@ -19,8 +34,53 @@ IS_ALPHA = 2
 IS_ALPHA_ADD = 4
 IS_ALPHA_SUBTRACT = 8
 
+# the pre-sliced suffix has to be checked first since it also ends with the non-sliced one
+TEXTURE_INFO_SUFFIXES = ("-preSliced-texture-info.txt", "-texture-info.txt")
+WORLD_DAE_SUFFIX = "-world.dae"
+
+IMPORT_CACHE_FILE_NAME = "kh-import-cache.json"
+# custom property storing the hash of the png an image was loaded from
+IMAGE_HASH_PROPERTY = "kh_content_hash"
+# custom properties that let a later import find and update the datablocks of an earlier one
+MATERIAL_KEY_PROPERTY = "kh_material_key"
+WORLD_ID_PROPERTY = "kh_world_id"
+GROUP_INDEX_PROPERTY = "kh_group_index"
+FINGERPRINTS_PROPERTY = "kh_fingerprints"
+# importer settings that do not change the imported result
+NON_RESULT_OPTIONS = ("filter_glob", "cache_texture_info", "cache_geometry", "write_profile", "update_existing", "staged_import", "use_modal", "world_cache", "world_cache_directory", "world_cache_size_limit")
+
+MAIN_UV_MAP_NAME = "UVMap"
+ALPHA_UV_MAP_NAME = "AlphaUVMap"
+
+GEOMETRY_CACHE_SUFFIX = "-geometry.npz"
+# used when no world cache directory is set, inside blender's user datafiles directory
+WORLD_CACHE_DIRECTORY_NAME = "kh_world_cache"
+# part of every world cache key, increase it whenever the importer's result changes so worlds cached by older versions are imported again
+WORLD_CACHE_VERSION = 1
+# cache files are named <world>-<key>.blend, eviction never touches other files in the cache directory
+WORLD_CACHE_FILE_PATTERN = re.compile(r"^.+-[0-9a-f]{32}\.blend(\.tmp)?$")
+# unfinished cache writes older than this are left over from an interrupted import
+WORLD_CACHE_TEMPORARY_FILE_SECONDS = 3600
+PROFILE_SUFFIX = "-import-profile.json"
+# files are hashed in chunks of this many bytes so big files are never read into memory at once
+HASH_CHUNK_SIZE = 1024 * 1024
+
+REGION_WRAP_NODE_GROUP_NAME = "KH Region Wrap"
+SURFACE_NODE_GROUP_NAME = "KH Surface"
+# how far uvs may leave the 0-1 range and still be moved into a texture region directly
+UV_REGION_EPSILON = 1e-4
+
+# share of a modal import's progress bar used by hashing the input files, reading the geometry, fingerprinting it and building it
+HASH_PROGRESS = 0.05
+PARSE_PROGRESS = 0.25
+FINGERPRINT_PROGRESS = 0.3
+GEOMETRY_PROGRESS = 0.4
+# how long a modal import works before it lets blender redraw and handle events
+MODAL_STEP_SECONDS = 0.05
+
 class TextureInfo:
-    def __init__(self, group_index: int, mesh_index: int, texture_name: str, alpha_flags: int, priority: int, draw_priority: int, wrap_u: str, wrap_v: str):
+    # region_u and region_v are the pixel ranges used by the Region wrap modes, they are only set for non-sliced textures
+    def __init__(self, group_index: int, mesh_index: int, texture_name: str, alpha_flags: int, priority: int, draw_priority: int, wrap_u: str, wrap_v: str, region_u: tuple[float, float] | None = None, region_v: tuple[float, float] | None = None):
         self.group_index = group_index
         self.mesh_index = mesh_index
         self.texture_name = texture_name
@@ -29,11 +89,1528 @@ class TextureInfo:
         self.draw_priority = draw_priority
         self.wrap_u = wrap_u
         self.wrap_v = wrap_v
+        self.region_u = region_u
+        self.region_v = region_v
+
+def get_world_id(texture_info_path: str) -> str | None:
+    file_name = os.path.basename(texture_info_path)
+    for suffix in TEXTURE_INFO_SUFFIXES:
+        if file_name.endswith(suffix):
+            return file_name[:-len(suffix)]
+    return None
+
+class UVWrap:
+    """How a material samples its texture, offset and scale move the 0-1 uv range into a region of the texture before it is wrapped"""
+    def __init__(self, wrap_u: str, wrap_v: str, offset: tuple[float, float] = (0.0, 0.0), scale: tuple[float, float] = (1.0, 1.0)):
+        self.wrap_u = wrap_u
+        self.wrap_v = wrap_v
+        self.offset = offset
+        self.scale = scale
+
+    @property
+    def is_region(self) -> bool:
+        return self.offset != (0.0, 0.0) or self.scale != (1.0, 1.0)
+
+    def key(self) -> tuple:
+        return (self.wrap_u, self.wrap_v, self.offset, self.scale)
+
+def read_png_size(path: str) -> tuple[int, int]:
+    # the size is in the IHDR chunk which always comes first, this avoids decoding the image
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if header[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a png file")
+    return struct.unpack(">II", header[16:24])
+
+def fit_uv_wrap(mesh: bpy.types.Mesh, texture_info: TextureInfo, texture_path: str) -> UVWrap:
+    """Maps the Region wrap modes of a non-sliced texture onto the whole texture, axes whose uvs never leave the 0-1 range are moved into the region directly in the uv layer, the rest are left for the region wrap node group"""
+    if texture_info.region_u is None:
+        return UVWrap(texture_info.wrap_u, texture_info.wrap_v)
+    width, height = read_png_size(texture_path)
+    uv_layer = mesh.uv_layers[0]
+    uvs = np.empty(len(uv_layer.data) * 2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", uvs)
+    uvs = uvs.reshape(-1, 2)
+
+    wraps = [texture_info.wrap_u, texture_info.wrap_v]
+    offset = [0.0, 0.0]
+    scale = [1.0, 1.0]
+    moved = False
+    for axis, ((start, end), size) in enumerate(((texture_info.region_u, width), (texture_info.region_v, height))):
+        if not wraps[axis].startswith("Region"):
+            continue
+        wraps[axis] = wraps[axis][len("Region"):]
+        axis_scale = (end - start) / size
+        # the exported v axis is flipped so the region is measured from the bottom of the texture
+        axis_offset = start / size if axis == 0 else 1 - end / size
+        if axis_offset == 0 and axis_scale == 1:
+            continue
+        axis_uvs = uvs[:, axis]
+        if len(axis_uvs) == 0 or (axis_uvs.min() >= -UV_REGION_EPSILON and axis_uvs.max() <= 1 + UV_REGION_EPSILON):
+            # nothing wraps, so the region can be baked into the uvs and the texture sampled directly
+            uvs[:, axis] = np.clip(axis_uvs, 0, 1) * axis_scale + axis_offset
+            wraps[axis] = "Clamp"
+            moved = True
+        else:
+            offset[axis] = axis_offset
+            scale[axis] = axis_scale
+    if moved:
+        uv_layer.data.foreach_set("uv", uvs.ravel())
+    return UVWrap(wraps[0], wraps[1], (offset[0], offset[1]), (scale[0], scale[1]))
+
+def new_node_group_socket(node_group: bpy.types.NodeTree, name: str, in_out: str, socket_type: str):
+    # node group sockets moved to the interface api in blender 4.0
+    if hasattr(node_group, "interface"):
+        return node_group.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    return (node_group.inputs if in_out == 'INPUT' else node_group.outputs).new(socket_type, name)
+
+def get_region_wrap_node_group() -> bpy.types.ShaderNodeTree:
+    """Shader node group that wraps a uv inside 0-1 with repeat or clamp per axis and then moves it into a region of the texture"""
+    node_group = bpy.data.node_groups.get(REGION_WRAP_NODE_GROUP_NAME)
+    if node_group is not None:
+        return node_group
+    node_group = bpy.data.node_groups.new(REGION_WRAP_NODE_GROUP_NAME, 'ShaderNodeTree')
+    new_node_group_socket(node_group, "UV", 'INPUT', 'NodeSocketVector')
+    new_node_group_socket(node_group, "Offset", 'INPUT', 'NodeSocketVector')
+    new_node_group_socket(node_group, "Scale", 'INPUT', 'NodeSocketVector')
+    # 1 to repeat the axis, 0 to clamp it
+    new_node_group_socket(node_group, "Repeat", 'INPUT', 'NodeSocketVector')
+    new_node_group_socket(node_group, "UV", 'OUTPUT', 'NodeSocketVector')
+    nodes = node_group.nodes
+    links = node_group.links
+
+    input_node = nodes.new('NodeGroupInput')
+    output_node = nodes.new('NodeGroupOutput')
+    output_node.location = (1000, 0)
+    def vector_math(operation: str, x: int, y: int) -> bpy.types.ShaderNodeVectorMath:
+        node = nodes.new('ShaderNodeVectorMath')
+        node.operation = operation
+        node.location = (x, y)
+        return node
+
+    fraction_node = vector_math('FRACTION', 200, 100)
+    links.new(input_node.outputs["UV"], fraction_node.inputs[0])
+    minimum_node = vector_math('MINIMUM', 200, -100)
+    minimum_node.inputs[1].default_value = (1, 1, 1)
+    links.new(input_node.outputs["UV"], minimum_node.inputs[0])
+    clamp_node = vector_math('MAXIMUM', 400, -100)
+    clamp_node.inputs[1].default_value = (0, 0, 0)
+    links.new(minimum_node.outputs[0], clamp_node.inputs[0])
+    # clamped + (fraction - clamped) * repeat picks the wrap mode of each axis
+    difference_node = vector_math('SUBTRACT', 400, 100)
+    links.new(fraction_node.outputs[0], difference_node.inputs[0])
+    links.new(clamp_node.outputs[0], difference_node.inputs[1])
+    wrap_node = vector_math('MULTIPLY_ADD', 600, 0)
+    links.new(difference_node.outputs[0], wrap_node.inputs[0])
+    links.new(input_node.outputs["Repeat"], wrap_node.inputs[1])
+    links.new(clamp_node.outputs[0], wrap_node.inputs[2])
+    region_node = vector_math('MULTIPLY_ADD', 800, 0)
+    links.new(wrap_node.outputs[0], region_node.inputs[0])
+    links.new(input_node.outputs["Scale"], region_node.inputs[1])
+    links.new(input_node.outputs["Offset"], region_node.inputs[2])
+    links.new(region_node.outputs[0], output_node.inputs["UV"])
+    return node_group
+
+def get_surface_node_group() -> bpy.types.ShaderNodeTree:
+    """Shader node group shared by every imported material, the material mode and blend kind are inputs so materials only differ in their values"""
+    node_group = bpy.data.node_groups.get(SURFACE_NODE_GROUP_NAME)
+    if node_group is not None:
+        return node_group
+    node_group = bpy.data.node_groups.new(SURFACE_NODE_GROUP_NAME, 'ShaderNodeTree')
+    new_node_group_socket(node_group, "Colour", 'INPUT', 'NodeSocketColor')
+    new_node_group_socket(node_group, "Alpha", 'INPUT', 'NodeSocketFloat')
+    # the switches below are 0 or 1
+    new_node_group_socket(node_group, "Use Vertex Colour", 'INPUT', 'NodeSocketFloat')
+    new_node_group_socket(node_group, "Lit", 'INPUT', 'NodeSocketFloat')
+    new_node_group_socket(node_group, "Emission Strength", 'INPUT', 'NodeSocketFloat')
+    new_node_group_socket(node_group, "Use Alpha", 'INPUT', 'NodeSocketFloat')
+    new_node_group_socket(node_group, "Additive", 'INPUT', 'NodeSocketFloat')
+    new_node_group_socket(node_group, "Shader", 'OUTPUT', 'NodeSocketShader')
+    nodes = node_group.nodes
+    links = node_group.links
+
+    input_node = nodes.new('NodeGroupInput')
+    output_node = nodes.new('NodeGroupOutput')
+    output_node.location = (1400, 0)
+    def math_node(operation: str, x: int, y: int) -> bpy.types.ShaderNodeMath:
+        node = nodes.new('ShaderNodeMath')
+        node.operation = operation
+        node.location = (x, y)
+        return node
+
+    # multiply the texture colour with the vertex colour
+    vertex_colour_node: bpy.types.ShaderNode = nodes.new('ShaderNodeVertexColor')
+    vertex_colour_node.label = "Vertex Colour RGB"
+    vertex_colour_node.location = (0, 300)
+    colour_multiply_node: bpy.types.ShaderNodeMixRGB = nodes.new('ShaderNodeMixRGB')
+    colour_multiply_node.label = "Vertex Colour Multiply"
+    colour_multiply_node.blend_type = 'MULTIPLY'
+    colour_multiply_node.location = (200, 300)
+    links.new(input_node.outputs["Use Vertex Colour"], colour_multiply_node.inputs[0])
+    links.new(input_node.outputs["Colour"], colour_multiply_node.inputs[1])
+    links.new(vertex_colour_node.outputs[0], colour_multiply_node.inputs[2])
+
+    # alpha is stored in the second uv map's x coordinate
+    alpha_uv_map_node: bpy.types.ShaderNodeUVMap = nodes.new('ShaderNodeUVMap')
+    alpha_uv_map_node.label = "Alpha UV Map"
+    alpha_uv_map_node.uv_map = ALPHA_UV_MAP_NAME
+    alpha_uv_map_node.location = (0, -300)
+    alpha_uv_split_node: bpy.types.ShaderNodeSeparateXYZ = nodes.new('ShaderNodeSeparateXYZ')
+    alpha_uv_split_node.label = "Alpha UV Split"
+    alpha_uv_split_node.location = (200, -300)
+    links.new(alpha_uv_map_node.outputs[0], alpha_uv_split_node.inputs[0])
+    # alpha + (alpha * vertex alpha - alpha) * use vertex colour
+    vertex_alpha_node = math_node('MULTIPLY', 400, -300)
+    links.new(alpha_uv_split_node.outputs[0], vertex_alpha_node.inputs[0])
+    links.new(input_node.outputs["Alpha"], vertex_alpha_node.inputs[1])
+    vertex_alpha_difference_node = math_node('SUBTRACT', 600, -300)
+    links.new(vertex_alpha_node.outputs[0], vertex_alpha_difference_node.inputs[0])
+    links.new(input_node.outputs["Alpha"], vertex_alpha_difference_node.inputs[1])
+    alpha_node = math_node('MULTIPLY_ADD', 800, -300)
+    links.new(vertex_alpha_difference_node.outputs[0], alpha_node.inputs[0])
+    links.new(input_node.outputs["Use Vertex Colour"], alpha_node.inputs[1])
+    links.new(input_node.outputs["Alpha"], alpha_node.inputs[2])
+    # without alpha the coverage is always 1: (alpha - 1) * use alpha + 1
+    alpha_offset_node = math_node('SUBTRACT', 1000, -300)
+    alpha_offset_node.inputs[1].default_value = 1
+    links.new(alpha_node.outputs[0], alpha_offset_node.inputs[0])
+    coverage_node = math_node('MULTIPLY_ADD', 1200, -300)
+    coverage_node.inputs[2].default_value = 1
+    links.new(alpha_offset_node.outputs[0], coverage_node.inputs[0])
+    links.new(input_node.outputs["Use Alpha"], coverage_node.inputs[1])
+
+    # unlit materials are emissive, lit materials use the diffuse bsdf
+    emission_node: bpy.types.ShaderNodeEmission = nodes.new('ShaderNodeEmission')
+    emission_node.location = (400, 200)
+    links.new(colour_multiply_node.outputs[0], emission_node.inputs[0])
+    links.new(input_node.outputs["Emission Strength"], emission_node.inputs[1])
+    diffuse_node: bpy.types.ShaderNodeBsdfDiffuse = nodes.new('ShaderNodeBsdfDiffuse')
+    diffuse_node.location = (400, 50)
+    links.new(colour_multiply_node.outputs[0], diffuse_node.inputs[0])
+    lit_node: bpy.types.ShaderNodeMixShader = nodes.new('ShaderNodeMixShader')
+    lit_node.location = (600, 100)
+    links.new(input_node.outputs["Lit"], lit_node.inputs[0])
+    links.new(emission_node.outputs[0], lit_node.inputs[1])
+    links.new(diffuse_node.outputs[0], lit_node.inputs[2])
+
+    # white color for the transparent shader, this means the transparent shader will be fully transparent
+    transparent_shader_node: bpy.types.ShaderNodeBsdfTransparent = nodes.new('ShaderNodeBsdfTransparent')
+    transparent_shader_node.inputs[0].default_value = (1, 1, 1, 1)
+    transparent_shader_node.location = (600, -100)
+    mix_shader_node: bpy.types.ShaderNodeMixShader = nodes.new('ShaderNodeMixShader')
+    mix_shader_node.location = (1200, 0)
+    links.new(coverage_node.outputs[0], mix_shader_node.inputs[0])
+    links.new(transparent_shader_node.outputs[0], mix_shader_node.inputs[1])
+    links.new(lit_node.outputs[0], mix_shader_node.inputs[2])
+    add_shader_node: bpy.types.ShaderNodeAddShader = nodes.new('ShaderNodeAddShader')
+    add_shader_node.location = (1000, 150)
+    links.new(transparent_shader_node.outputs[0], add_shader_node.inputs[0])
+    links.new(lit_node.outputs[0], add_shader_node.inputs[1])
+    blend_kind_node: bpy.types.ShaderNodeMixShader = nodes.new('ShaderNodeMixShader')
+    blend_kind_node.location = (1200, 150)
+    links.new(input_node.outputs["Additive"], blend_kind_node.inputs[0])
+    links.new(mix_shader_node.outputs[0], blend_kind_node.inputs[1])
+    links.new(add_shader_node.outputs[0], blend_kind_node.inputs[2])
+    links.new(blend_kind_node.outputs[0], output_node.inputs["Shader"])
+    return node_group
+
+def weld_positions(positions: np.ndarray, inverse: np.ndarray, weld_distance: float) -> np.ndarray:
+    """Merges the groups of positions within weld_distance of each other, directly or through a chain of close positions, inverse maps every position to its group and the merged mapping is returned"""
+    group_positions = np.zeros((inverse.max() + 1, 3), dtype=np.float32)
+    group_positions[inverse] = positions
+    tree = KDTree(len(group_positions))
+    for group, position in enumerate(group_positions.tolist()):
+        tree.insert(position, group)
+    tree.balance()
+
+    parents = list(range(len(group_positions)))
+    def find(group: int) -> int:
+        while parents[group] != group:
+            parents[group] = parents[parents[group]]
+            group = parents[group]
+        return group
+    for group, position in enumerate(group_positions.tolist()):
+        for _, other, _ in tree.find_range(position, weld_distance):
+            root, other_root = find(group), find(other)
+            if root != other_root:
+                parents[max(root, other_root)] = min(root, other_root)
+
+    _, merged = np.unique([find(group) for group in range(len(parents))], return_inverse=True)
+    return merged.reshape(-1)[inverse]
+
+def nudge_vertices(mesh: bpy.types.Mesh, distance: float, weld_distance: float = 0.0) -> int:
+    """Push every vertex of the mesh out along the average normal of all vertices sharing its position, returns the number of vertices moved"""
+    vertex_count = len(mesh.vertices)
+    if vertex_count == 0 or distance == 0:
+        return 0
+    positions = np.empty(vertex_count * 3, dtype=np.float32)
+    normals = np.empty(vertex_count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    mesh.vertices.foreach_get("normal", normals)
+    positions = positions.reshape(-1, 3)
+    normals = normals.reshape(-1, 3)
+
+    # group coincident positions, optionally welding nearly coincident vertices together
+    _, inverse = np.unique(positions, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    if weld_distance > 0:
+        inverse = weld_positions(positions, inverse, weld_distance)
+
+    # average the unit normals of each group
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    group_normals = np.zeros((inverse.max() + 1, 3), dtype=np.float32)
+    np.add.at(group_normals, inverse, normals)
+    lengths = np.linalg.norm(group_normals, axis=1, keepdims=True)
+    group_normals = np.divide(group_normals, lengths, out=np.zeros_like(group_normals), where=lengths > 0)
+
+    positions += group_normals[inverse] * distance
+    mesh.vertices.foreach_set("co", positions.ravel())
+    mesh.update()
+    return vertex_count
+
+class FileInfoCache:
+    """Json sidecar storing values derived from files in a directory, an entry is dropped as soon as its file's size or modification time changes"""
+    def __init__(self, path: str):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.entries: dict[str, dict] = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # a broken cache is the same as no cache
+                self.entries = {}
+
+    def _get_entry(self, file_path: str, create: bool) -> dict | None:
+        stat = os.stat(file_path)
+        key = os.path.relpath(file_path, self.directory).replace(os.sep, "/")
+        entry = self.entries.get(key)
+        if entry is None or entry.get("size") != stat.st_size or entry.get("mtime") != stat.st_mtime_ns:
+            if not create:
+                return None
+            entry = self.entries[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        return entry
+
+    def get(self, file_path: str, field: str):
+        entry = self._get_entry(file_path, False)
+        return None if entry is None else entry.get(field)
+
+    def set(self, file_path: str, field: str, value):
+        self._get_entry(file_path, True)[field] = value
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.entries, f, indent=1)
+            self.dirty = False
+        except OSError:
+            # the cache is only an optimisation, a read only export folder should not fail the import
+            pass
+
+class CutoutDetector:
+    """Detects textures that use their alpha channel, results are memoised per image and optionally stored in a FileInfoCache per texture file"""
+    def __init__(self):
+        self.results: dict[str, bool] = {}
+        self.pixels_scanned = 0
+
+    def is_cutout(self, image: bpy.types.Image, texture_path: str, file_cache: FileInfoCache | None = None) -> bool:
+        if image.name in self.results:
+            return self.results[image.name]
+        result = file_cache.get(texture_path, "cutout") if file_cache is not None else None
+        if result is None:
+            result = self.scan(image)
+            if file_cache is not None:
+                file_cache.set(texture_path, "cutout", result)
+        self.results[image.name] = result
+        return result
+
+    def scan(self, image: bpy.types.Image) -> bool:
+        if image.channels == 3:
+            return False
+        if image.channels != 4:
+            raise ValueError(f"Texture {image.name} has an invalid number of channels")
+        # check if the texture has any data in the alpha channel
+        pixels = np.empty(len(image.pixels), dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        self.pixels_scanned += len(pixels) // 4
+        return bool((pixels[3::4] < 1).any())
+
+def hash_file(path: str) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+class ImageLibrary:
+    """Loads every distinct texture file content once, textures with identical pngs share one image and images from earlier imports are found by their stored hash"""
+    def __init__(self):
+        # content hash -> image name, built from bpy.data.images on first use
+        self.images: dict[str, str] | None = None
+        self.hashes: dict[str, str] = {}
+        self.pending_hashes: dict[str, concurrent.futures.Future] = {}
+        self.loaded = 0
+        self.files_hashed = 0
+        self.deduplicated = 0
+
+    def get_hash(self, texture_path: str, file_cache: FileInfoCache | None = None) -> str:
+        if texture_path in self.hashes:
+            return self.hashes[texture_path]
+        content_hash = file_cache.get(texture_path, "hash") if file_cache is not None else None
+        if content_hash is None:
+            pending_hash = self.pending_hashes.pop(texture_path, None)
+            content_hash = pending_hash.result() if pending_hash is not None else hash_file(texture_path)
+            self.files_hashed += 1
+            if file_cache is not None:
+                file_cache.set(texture_path, "hash", content_hash)
+        self.hashes[texture_path] = content_hash
+        return content_hash
+
+    def prefetch(self, texture_paths, file_cache: FileInfoCache | None = None):
+        """Starts reading and hashing the texture files whose hash is not known yet on background threads"""
+        texture_paths = [texture_path for texture_path in texture_paths if texture_path not in self.hashes and texture_path not in self.pending_hashes and (file_cache is None or file_cache.get(texture_path, "hash") is None)]
+        if not texture_paths:
+            return
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(texture_paths), os.cpu_count() or 1, 8))
+        for texture_path in texture_paths:
+            self.pending_hashes[texture_path] = executor.submit(hash_file, texture_path)
+        # the submitted hashes still finish, the threads exit once they are done
+        executor.shutdown(wait=False)
+
+    def load(self, texture_path: str, file_cache: FileInfoCache | None = None) -> bpy.types.Image:
+        if self.images is None:
+            self.images = {image[IMAGE_HASH_PROPERTY]: image.name for image in bpy.data.images if IMAGE_HASH_PROPERTY in image}
+        content_hash = self.get_hash(texture_path, file_cache)
+        image = bpy.data.images.get(self.images.get(content_hash, ""))
+        # the image may have been removed or renamed to the name of another image since it was indexed
+        if image is not None and image.get(IMAGE_HASH_PROPERTY) == content_hash:
+            self.deduplicated += 1
+            return image
+        image = bpy.data.images.load(texture_path)
+        self.loaded += 1
+        image[IMAGE_HASH_PROPERTY] = content_hash
+        self.images[content_hash] = image.name
+        return image
+
+class ImportProfile:
+    """Wall clock time spent in each phase of an import and counters of the work that was done"""
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start_time
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        counters = ", ".join(f"{name} {value}" for name, value in self.counters.items())
+        return f"{phases} | {counters}"
+
+    def to_dict(self) -> dict:
+        return {"total_seconds": sum(self.phases.values()), "phases": self.phases, "counters": self.counters}
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+class MaterialCache:
+    """Shares one material between every mesh with the same rendering signature, the signature is also stored on the material so later imports can find it"""
+    def __init__(self):
+        self.materials: dict[str, bpy.types.Material] = {}
+        # as_pointer() of every cached material so contains does not scan the dict
+        self.material_pointers: set[int] = set()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, key: str) -> bpy.types.Material | None:
+        material = self.materials.get(key)
+        if material is not None:
+            self.reused += 1
+        return material
+
+    def add(self, key: str, material: bpy.types.Material):
+        material[MATERIAL_KEY_PROPERTY] = key
+        self.materials[key] = material
+        self.material_pointers.add(material.as_pointer())
+        self.created += 1
+
+    def add_existing(self, materials):
+        for material in materials:
+            key = material.get(MATERIAL_KEY_PROPERTY)
+            if key is not None and key not in self.materials:
+                self.materials[key] = material
+                self.material_pointers.add(material.as_pointer())
+
+    def contains(self, material: bpy.types.Material) -> bool:
+        return material.as_pointer() in self.material_pointers
+
+    def remove(self, material: bpy.types.Material):
+        """Forgets a material that is about to be removed from bpy.data so get never returns it again"""
+        key = material.get(MATERIAL_KEY_PROPERTY)
+        if key is not None and self.materials.get(key) == material:
+            del self.materials[key]
+        self.material_pointers.discard(material.as_pointer())
+
+class WorldObjectIndex:
+    """Finds the group and mesh objects of an imported world by parsing every object name once"""
+    # mesh objects are named "Group <group> Mesh <mesh>" or "BOB <bob> Mesh <mesh>", optionally followed by a .001 style suffix
+    MESH_NAME_PATTERN = re.compile(r"^(?:Group|BOB) \d+ Mesh (\d+)(?!\d)")
+
+    def __init__(self, world_id: str, objects: list[bpy.types.Object]):
+        self.roots: dict[int, bpy.types.Object] = {}
+        self.meshes: dict[tuple[int, int], bpy.types.Object] = {}
+
+        root_kinds: dict[int, str] = {}
+        for obj in objects:
+            if obj.parent is not None:
+                continue
+            root = self.parse_root_name(obj.name)
+            if root is None:
+                continue
+            group_index, root_kinds[group_index] = root
+            self.roots[group_index] = obj
+
+        group_index_by_root = {root.name: group_index for group_index, root in self.roots.items()}
+        for obj in objects:
+            if obj.parent is None or obj.parent.name not in group_index_by_root:
+                continue
+            mesh_index = self.parse_mesh_name(obj.name)
+            if mesh_index is not None:
+                self.meshes[(group_index_by_root[obj.parent.name], mesh_index)] = obj
+
+        # rename and rescale only after every name has been parsed so renames can not affect the parsing
+        for group_index, obj in self.roots.items():
+            obj.name = f"{world_id} {group_index} {root_kinds[group_index]}"
+            obj.scale = (0.01, 0.01, 0.01)
+            obj.location *= 0.01
+        for (group_index, mesh_index), obj in self.meshes.items():
+            obj.name = f"{world_id} {group_index} {mesh_index}"
+
+    @staticmethod
+    def parse_root_name(name: str) -> tuple[int, str] | None:
+        # root objects are named "<group> Mesh Group <group>" or "<group> BOB <bob>"
+        split = name.split(" ")
+        if len(split) < 2 or not split[0].isdigit():
+            return None
+        return int(split[0]), 'Mesh Group' if split[1] == 'Mesh' else 'BOB'
+
+    @classmethod
+    def parse_mesh_name(cls, name: str) -> int | None:
+        match = cls.MESH_NAME_PATTERN.match(name)
+        return None if match is None else int(match[1])
+
+    def get_root(self, group_index: int) -> bpy.types.Object | None:
+        return self.roots.get(group_index)
+
+    def get_mesh(self, group_index: int, mesh_index: int) -> bpy.types.Object | None:
+        return self.meshes.get((group_index, mesh_index))
+
+COLLADA_NAMESPACE = "{http://www.collada.org/2005/11/COLLADASchema}"
+
+class MeshGeometry:
+    """Triangulated mesh data read from a world file, every array is indexed per loop except positions which are indexed by loop_vertices"""
+    def __init__(self, name: str, positions: np.ndarray, loop_vertices: np.ndarray, face_sizes: np.ndarray, uvs: np.ndarray | None, alpha_uvs: np.ndarray | None, colours: np.ndarray | None):
+        self.name = name
+        self.positions = positions
+        self.loop_vertices = loop_vertices
+        self.face_sizes = face_sizes
+        self.uvs = uvs
+        self.alpha_uvs = alpha_uvs
+        self.colours = colours
+
+class WorldNode:
+    def __init__(self, name: str, matrix: np.ndarray, mesh: MeshGeometry | None, children: list["WorldNode"]):
+        self.name = name
+        self.matrix = matrix
+        self.mesh = mesh
+        self.children = children
+
+class WorldGeometry:
+    def __init__(self, nodes: list[WorldNode], up_axis: str):
+        self.nodes = nodes
+        self.up_axis = up_axis
+
+def _collada_floats(text: str | None) -> np.ndarray:
+    return np.array(text.split(), dtype=np.float32) if text else np.empty(0, dtype=np.float32)
+
+def _read_collada_geometry(geometry_element) -> MeshGeometry | None:
+    mesh_element = geometry_element.find(COLLADA_NAMESPACE + "mesh")
+    if mesh_element is None:
+        return None
+    sources: dict[str, np.ndarray] = {}
+    for source_element in mesh_element.iterfind(COLLADA_NAMESPACE + "source"):
+        accessor_element = source_element.find(f"{COLLADA_NAMESPACE}technique_common/{COLLADA_NAMESPACE}accessor")
+        stride = int(accessor_element.get("stride", "1")) if accessor_element is not None else 1
+        sources[source_element.get("id")] = _collada_floats(source_element.findtext(COLLADA_NAMESPACE + "float_array")).reshape(-1, stride)
+    # <vertices> gives the position source and any other per vertex data
+    vertex_inputs = {input_element.get("semantic"): sources[input_element.get("source")[1:]] for input_element in mesh_element.find(COLLADA_NAMESPACE + "vertices").iterfind(COLLADA_NAMESPACE + "input")}
+    positions = vertex_inputs["POSITION"]
+
+    loop_vertices: list[np.ndarray] = []
+    face_sizes: list[np.ndarray] = []
+    uv_sets: dict[int, list[np.ndarray]] = {}
+    colours: list[np.ndarray] = []
+    for primitive_element in mesh_element:
+        if primitive_element.tag not in (COLLADA_NAMESPACE + "triangles", COLLADA_NAMESPACE + "polylist"):
+            continue
+        input_elements = primitive_element.findall(COLLADA_NAMESPACE + "input")
+        index_stride = max(int(input_element.get("offset")) for input_element in input_elements) + 1
+        indices = np.array(primitive_element.findtext(COLLADA_NAMESPACE + "p").split(), dtype=np.int32).reshape(-1, index_stride)
+        if primitive_element.tag == COLLADA_NAMESPACE + "triangles":
+            face_sizes.append(np.full(len(indices) // 3, 3, dtype=np.int32))
+        else:
+            face_sizes.append(np.array(primitive_element.findtext(COLLADA_NAMESPACE + "vcount").split(), dtype=np.int32))
+        for input_element in input_elements:
+            semantic = input_element.get("semantic")
+            input_indices = indices[:, int(input_element.get("offset"))]
+            if semantic == "VERTEX":
+                loop_vertices.append(input_indices)
+                if "TEXCOORD" in vertex_inputs:
+                    uv_sets.setdefault(0, []).append(vertex_inputs["TEXCOORD"][input_indices, :2])
+                if "COLOR" in vertex_inputs:
+                    colours.append(vertex_inputs["COLOR"][input_indices])
+            elif semantic == "TEXCOORD":
+                uv_sets.setdefault(int(input_element.get("set", "0")), []).append(sources[input_element.get("source")[1:]][input_indices, :2])
+            elif semantic == "COLOR":
+                colours.append(sources[input_element.get("source")[1:]][input_indices])
+
+    if not loop_vertices:
+        return None
+    uv_layers = [np.concatenate(uv_sets[uv_set]) for uv_set in sorted(uv_sets)]
+    colour_data = np.concatenate(colours) if colours else None
+    if colour_data is not None and colour_data.shape[1] == 3:
+        colour_data = np.concatenate((colour_data, np.ones((len(colour_data), 1), dtype=np.float32)), axis=1)
+    return MeshGeometry(
+        geometry_element.get("name") or geometry_element.get("id"),
+        positions[:, :3],
+        np.concatenate(loop_vertices),
+        np.concatenate(face_sizes),
+        uv_layers[0] if len(uv_layers) > 0 else None,
+        uv_layers[1] if len(uv_layers) > 1 else None,
+        colour_data,
+    )
+
+def _read_collada_node(node_element, geometries: dict[str, MeshGeometry]) -> WorldNode:
+    matrix_text = node_element.findtext(COLLADA_NAMESPACE + "matrix")
+    matrix = _collada_floats(matrix_text).reshape(4, 4) if matrix_text else np.identity(4, dtype=np.float32)
+    mesh = None
+    instance_element = node_element.find(COLLADA_NAMESPACE + "instance_geometry")
+    if instance_element is not None:
+        mesh = geometries.get(instance_element.get("url")[1:])
+    children = [_read_collada_node(child_element, geometries) for child_element in node_element.iterfind(COLLADA_NAMESPACE + "node")]
+    return WorldNode(node_element.get("name") or node_element.get("id"), matrix, mesh, children)
+
+def run_steps(steps):
+    """Runs a generator that does its work in steps to the end and returns its result"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+def read_collada_world(path: str) -> WorldGeometry:
+    return run_steps(read_collada_world_steps(path))
+
+def read_collada_world_steps(path: str):
+    """Reads the nodes and meshes of a world dae, geometry is parsed and released one element at a time so the whole document is never held in memory, yields the share of the file read after every geometry element and returns the WorldGeometry"""
+    geometries: dict[str, MeshGeometry] = {}
+    visual_scene_element = None
+    up_axis = "Y_UP"
+    file_size = max(os.path.getsize(path), 1)
+    with open(path, "rb") as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag == COLLADA_NAMESPACE + "geometry":
+                geometry = _read_collada_geometry(element)
+                if geometry is not None:
+                    geometries[element.get("id")] = geometry
+                element.clear()
+                yield min(f.tell() / file_size, 1.0)
+            elif element.tag == COLLADA_NAMESPACE + "up_axis":
+                up_axis = element.text.strip()
+            elif element.tag == COLLADA_NAMESPACE + "visual_scene" and visual_scene_element is None:
+                # nodes are resolved at the end in case the geometry library comes after the scene
+                visual_scene_element = element
+    if visual_scene_element is None:
+        raise ValueError(f"{path} has no visual scene")
+    nodes = [_read_collada_node(node_element, geometries) for node_element in visual_scene_element.iterfind(COLLADA_NAMESPACE + "node")]
+    # some exporters wrap the scene in a single root node, the groups are its children
+    if len(nodes) == 1 and nodes[0].mesh is None and all(child.mesh is None for child in nodes[0].children):
+        nodes = nodes[0].children
+    return WorldGeometry(nodes, up_axis)
+
+def write_world_geometry_cache(path: str, world: WorldGeometry, source_path: str):
+    """Writes the world to a compact numpy sidecar that load_world_geometry reads instead of the dae while the dae is unchanged"""
+    stat = os.stat(source_path)
+    header = {"version": 1, "source_size": stat.st_size, "source_mtime": stat.st_mtime_ns, "up_axis": world.up_axis, "nodes": [], "meshes": []}
+    arrays: dict[str, np.ndarray] = {}
+    mesh_ids: dict[int, int] = {}
+    def add_node(node: WorldNode, parent: int):
+        mesh_index = -1
+        if node.mesh is not None:
+            if id(node.mesh) not in mesh_ids:
+                mesh_index = mesh_ids[id(node.mesh)] = len(header["meshes"])
+                header["meshes"].append(node.mesh.name)
+                for field in ("positions", "loop_vertices", "face_sizes", "uvs", "alpha_uvs", "colours"):
+                    value = getattr(node.mesh, field)
+                    if value is not None:
+                        arrays[f"{mesh_index}_{field}"] = value
+            mesh_index = mesh_ids[id(node.mesh)]
+        node_index = len(header["nodes"])
+        header["nodes"].append({"name": node.name, "parent": parent, "matrix": node.matrix.ravel().tolist(), "mesh": mesh_index})
+        for child in node.children:
+            add_node(child, node_index)
+    for node in world.nodes:
+        add_node(node, -1)
+    with open(path, "wb") as f:
+        np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+def read_world_geometry_cache(path: str, source_path: str) -> WorldGeometry | None:
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(source_path)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header.get("version") != 1 or header["source_size"] != stat.st_size or header["source_mtime"] != stat.st_mtime_ns:
+                return None
+            meshes = [
+                MeshGeometry(name, *(data[f"{mesh_index}_{field}"] if f"{mesh_index}_{field}" in data.files else None for field in ("positions", "loop_vertices", "face_sizes", "uvs", "alpha_uvs", "colours")))
+                for mesh_index, name in enumerate(header["meshes"])
+            ]
+    except (OSError, ValueError, KeyError):
+        return None
+    nodes: list[WorldNode] = []
+    roots: list[WorldNode] = []
+    for node_info in header["nodes"]:
+        node = WorldNode(node_info["name"], np.array(node_info["matrix"], dtype=np.float32).reshape(4, 4), meshes[node_info["mesh"]] if node_info["mesh"] >= 0 else None, [])
+        nodes.append(node)
+        (roots if node_info["parent"] < 0 else nodes[node_info["parent"]].children).append(node)
+    return WorldGeometry(roots, header["up_axis"])
+
+def load_world_geometry(dae_path: str, use_cache: bool) -> WorldGeometry:
+    return run_steps(load_world_geometry_steps(dae_path, use_cache))
+
+def load_world_geometry_steps(dae_path: str, use_cache: bool):
+    """Generator version of load_world_geometry that yields the share of the dae read so far and returns the WorldGeometry"""
+    cache_path = os.path.splitext(dae_path)[0] + GEOMETRY_CACHE_SUFFIX
+    world = read_world_geometry_cache(cache_path, dae_path) if use_cache else None
+    if world is None:
+        world = yield from read_collada_world_steps(dae_path)
+        if use_cache:
+            try:
+                write_world_geometry_cache(cache_path, world, dae_path)
+            except OSError:
+                # the cache is only an optimisation, a read only export folder should not fail the import
+                pass
+    return world
+
+def get_colour_field() -> str:
+    return "color_srgb" if "color_srgb" in bpy.types.ByteColorAttributeValue.bl_rna.properties else "color"
+
+def create_mesh(geometry: MeshGeometry) -> bpy.types.Mesh:
+    mesh = bpy.data.meshes.new(geometry.name)
+    mesh.vertices.add(len(geometry.positions))
+    mesh.vertices.foreach_set("co", geometry.positions.ravel())
+    mesh.loops.add(len(geometry.loop_vertices))
+    mesh.loops.foreach_set("vertex_index", geometry.loop_vertices)
+    mesh.polygons.add(len(geometry.face_sizes))
+    loop_starts = np.zeros(len(geometry.face_sizes), dtype=np.int32)
+    np.cumsum(geometry.face_sizes[:-1], out=loop_starts[1:])
+    mesh.polygons.foreach_set("loop_start", loop_starts)
+    if bpy.app.version < (4, 0, 0):
+        # since 4.0 polygon sizes are derived from loop_start
+        mesh.polygons.foreach_set("loop_total", geometry.face_sizes)
+    for uv_map_name, uvs in ((MAIN_UV_MAP_NAME, geometry.uvs), (ALPHA_UV_MAP_NAME, geometry.alpha_uvs)):
+        if uvs is not None:
+            mesh.uv_layers.new(name=uv_map_name).data.foreach_set("uv", uvs.ravel())
+    if geometry.colours is not None:
+        colour_attribute = mesh.color_attributes.new("Col", 'BYTE_COLOR', 'CORNER')
+        # the dae stores the raw byte values, same as the collada importer
+        colour_attribute.data.foreach_set(get_colour_field(), geometry.colours.ravel())
+    mesh.update(calc_edges=True)
+    # the importer replaces the material in the first slot
+    mesh.materials.append(None)
+    return mesh
+
+def create_world_objects(world: WorldGeometry, collection: bpy.types.Collection, meshes: dict[int, bpy.types.Mesh] | None = None) -> list[bpy.types.Object]:
+    """Creates the node hierarchy of the world the same way the collada importer does, returns every created object, pass the same meshes dict to share meshes between calls"""
+    # blender is z up, rotate the root nodes the same way the collada importer does
+    axis_matrix = Matrix.Identity(4)
+    if world.up_axis == "Y_UP":
+        axis_matrix = Matrix.Rotation(math.radians(90), 4, 'X')
+    elif world.up_axis == "X_UP":
+        axis_matrix = Matrix.Rotation(math.radians(-90), 4, 'Y')
+
+    objects: list[bpy.types.Object] = []
+    if meshes is None:
+        meshes = {}
+    def add_node(node: WorldNode, parent: bpy.types.Object | None):
+        mesh = None
+        if node.mesh is not None:
+            if id(node.mesh) not in meshes:
+                meshes[id(node.mesh)] = create_mesh(node.mesh)
+            mesh = meshes[id(node.mesh)]
+        obj = bpy.data.objects.new(node.name, mesh)
+        matrix = Matrix(node.matrix.tolist())
+        if parent is None:
+            obj.matrix_basis = axis_matrix @ matrix
+        else:
+            obj.parent = parent
+            obj.matrix_basis = matrix
+        collection.objects.link(obj)
+        objects.append(obj)
+        for child in node.children:
+            add_node(child, obj)
+    for node in world.nodes:
+        add_node(node, None)
+    return objects
+
+def read_mesh_geometry(mesh: bpy.types.Mesh, matrix: Matrix) -> MeshGeometry:
+    """Reads the buffers of a mesh back into a MeshGeometry with the positions moved by matrix"""
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    transform = np.array(matrix, dtype=np.float32)
+    positions = positions.reshape(-1, 3) @ transform[:3, :3].T + transform[:3, 3]
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    face_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", face_sizes)
+    uvs = []
+    for uv_map_name in (MAIN_UV_MAP_NAME, ALPHA_UV_MAP_NAME):
+        uv_layer = mesh.uv_layers.get(uv_map_name)
+        if uv_layer is None:
+            uvs.append(None)
+            continue
+        uvs.append(np.empty(len(mesh.loops) * 2, dtype=np.float32))
+        uv_layer.data.foreach_get("uv", uvs[-1])
+        uvs[-1] = uvs[-1].reshape(-1, 2)
+    colours = None
+    if len(mesh.color_attributes) > 0:
+        colour_attribute = mesh.color_attributes[0]
+        colours = np.empty(len(colour_attribute.data) * 4, dtype=np.float32)
+        colour_attribute.data.foreach_get(get_colour_field(), colours)
+        colours = colours.reshape(-1, 4)
+        if colour_attribute.domain == 'POINT':
+            colours = colours[loop_vertices]
+    return MeshGeometry(mesh.name, positions, loop_vertices, face_sizes, uvs[0], uvs[1], colours)
+
+def merge_mesh_objects(name: str, parts: list[tuple[int, int, bpy.types.Object, Matrix]]) -> bpy.types.Mesh:
+    """Concatenates the meshes of (group_index, mesh_index, object, matrix) parts into one mesh, the indices of each part are kept in the kh_group_index and kh_mesh_index face attributes"""
+    geometries = [read_mesh_geometry(obj.data, matrix) for _, _, obj, matrix in parts]
+    vertex_offsets = np.zeros(len(geometries), dtype=np.int32)
+    np.cumsum([len(geometry.positions) for geometry in geometries[:-1]], out=vertex_offsets[1:])
+
+    def concatenate(field: str, width: int, fill: float) -> np.ndarray | None:
+        # parts without the buffer are filled so every loop keeps its place
+        if all(getattr(geometry, field) is None for geometry in geometries):
+            return None
+        return np.concatenate([getattr(geometry, field) if getattr(geometry, field) is not None else np.full((len(geometry.loop_vertices), width), fill, dtype=np.float32) for geometry in geometries])
+
+    merged = MeshGeometry(
+        name,
+        np.concatenate([geometry.positions for geometry in geometries]),
+        np.concatenate([geometry.loop_vertices + offset for geometry, offset in zip(geometries, vertex_offsets)]),
+        np.concatenate([geometry.face_sizes for geometry in geometries]),
+        concatenate("uvs", 2, 0.0),
+        concatenate("alpha_uvs", 2, 0.0),
+        concatenate("colours", 4, 1.0),
+    )
+    mesh = create_mesh(merged)
+    for attribute_name, index in (("kh_group_index", 0), ("kh_mesh_index", 1)):
+        values = np.concatenate([np.full(len(geometry.face_sizes), part[index], dtype=np.int32) for geometry, part in zip(geometries, parts)])
+        mesh.attributes.new(attribute_name, 'INT', 'FACE').data.foreach_set("value", values)
+    return mesh
+
+def fingerprint(*values: np.ndarray | str | None) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for value in values:
+        if isinstance(value, str):
+            hasher.update(value.encode())
+        elif value is not None:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+        # keeps a missing value from hashing the same as an empty one
+        hasher.update(b"|")
+    return hasher.hexdigest()
+
+def find_world_objects(world_id: str) -> list[bpy.types.Object]:
+    """Top level objects created by an earlier import of the world"""
+    return [obj for obj in bpy.data.objects if obj.parent is None and obj.get(WORLD_ID_PROPERTY) == world_id]
+
+def remove_object_tree(obj: bpy.types.Object, removed_materials: set[bpy.types.Material]):
+    """Removes the object, its children and any mesh only they used, the materials they used are collected so unused ones can be removed afterwards"""
+    for child in obj.children:
+        remove_object_tree(child, removed_materials)
+    removed_materials.update(slot.material for slot in obj.material_slots if slot.material is not None)
+    mesh = obj.data if obj.type == 'MESH' else None
+    bpy.data.objects.remove(obj, do_unlink=True)
+    if mesh is not None and mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+def evict_world_cache(directory: str, size_limit: int, keep: str):
+    """Removes the least recently used cache files until the cache fits in size_limit bytes"""
+    cache_files = []
+    for name in os.listdir(directory):
+        match = WORLD_CACHE_FILE_PATTERN.match(name)
+        if match is None:
+            continue
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        if match[1] is not None:
+            if time.time() - stat.st_mtime > WORLD_CACHE_TEMPORARY_FILE_SECONDS:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            continue
+        cache_files.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for _, size, _ in cache_files)
+    for _, size, path in sorted(cache_files):
+        if total_size <= size_limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total_size -= size
+        except OSError:
+            pass
+
+def remove_staging_collection(collection: bpy.types.Collection):
+    """Removes a staging collection, every object in it and the meshes only they used"""
+    meshes = [obj.data for obj in collection.objects if obj.type == 'MESH']
+    bpy.data.batch_remove(list(collection.objects) + [collection])
+    bpy.data.batch_remove([mesh for mesh in set(meshes) if mesh.users == 0])
+
+def get_option_values(options) -> dict:
+    """The importer settings that change the imported result"""
+    values = {name: getattr(options, name) for name in ImportKHWorld.__annotations__ if name not in NON_RESULT_OPTIONS}
+    # operator float properties are float32 while default_import_options has python floats, round both the same way so they fingerprint the same
+    return {name: float(np.float32(value)) if isinstance(value, float) else value for name, value in values.items()}
+
+class WorldImporter:
+    """Imports worlds with the settings of an ImportKHWorld operator, or any object with the same attributes, materials and cutout results are shared by every world imported with the same importer"""
+    def __init__(self, options, report):
+        self.options = options
+        self.report = report
+        self.material_cache = MaterialCache()
+        self.cutout_detector = CutoutDetector()
+        self.image_library = ImageLibrary()
+        self.file_caches: dict[str, FileInfoCache] = {}
+        # profile of the most recent import_world call
+        self.profile = ImportProfile()
+
+    def get_file_cache(self, directory: str) -> FileInfoCache | None:
+        if not self.options.cache_texture_info:
+            return None
+        if directory not in self.file_caches:
+            self.file_caches[directory] = FileInfoCache(os.path.join(directory, IMPORT_CACHE_FILE_NAME))
+        return self.file_caches[directory]
+
+    def import_world(self, context: bpy.types.Context, filepath: str, collection: bpy.types.Collection) -> set[str]:
+        return run_steps(self.import_world_steps(context, filepath, collection))
+
+    def run_phase_steps(self, name: str, steps, start: float, end: float):
+        """Runs a generator that yields its progress from 0 to 1 in the named profile phase, yields the progress moved into start-end and returns the generator's result"""
+        while True:
+            with self.profile.phase(name):
+                try:
+                    progress = next(steps)
+                except StopIteration as stop:
+                    return stop.value
+            yield start + (end - start) * progress
+
+    def import_world_steps(self, context: bpy.types.Context, filepath: str, collection: bpy.types.Collection):
+        """Generator version of import_world that yields the progress between small steps of the import and returns the operator result"""
+        directory = os.path.dirname(filepath)
+        world_id = get_world_id(filepath)
+        if world_id is None:
+            self.report({'ERROR'}, f"{filepath} is not a texture-info.txt file")
+            return {'CANCELLED'}
+        world_dae = os.path.join(directory, world_id + WORLD_DAE_SUFFIX)
+        if not os.path.exists(world_dae):
+            self.report({'ERROR'}, f"DAE file {world_dae} not found")
+            return {'CANCELLED'}
+
+        self.profile = ImportProfile()
+        texture_infos: [TextureInfo] = []
+        texture_lines: dict[tuple[int, int], str] = {}
+
+        failed = False
+
+        def get_texture_path(texture: TextureInfo):
+            return os.path.join(directory, texture.texture_name + ".png")
+
+        # parse the file
+        with self.profile.phase("parse"):
+            with open(filepath, "r") as f:
+                line_number = 0
+                for line in f.readlines():
+                    line_number += 1
+
+                    fields = line.split(":")
+                    region_u = region_v = None
+                    if len(fields) == 8:
+                        # non-sliced textures also store the pixel region used by the Region wrap modes
+                        mesh_info, texture_name, alpha_flags, priority, draw_priority, region_u_info, region_v_info, wrap_mode_info = fields
+                        region_u = tuple(float(value) for value in region_u_info.split(","))
+                        region_v = tuple(float(value) for value in region_v_info.split(","))
+                    else:
+                        mesh_info, texture_name, alpha_flags, priority, draw_priority, wrap_mode_info = fields
+                    alpha_flags, priority, draw_priority = int(alpha_flags), int(priority), int(draw_priority)
+                    group_index, mesh_index = mesh_info.split(",")
+                    group_index, mesh_index = int(group_index), int(mesh_index)
+                    texture_lines[(group_index, mesh_index)] = line.strip()
+                    wrap_u, wrap_v = wrap_mode_info.split(",")
+                    wrap_u, wrap_v = wrap_u.strip(), wrap_v.strip()
+
+                    if region_u is None and ("Region" in wrap_u or "Region" in wrap_v):
+                        self.report({'WARNING'}, f"{filepath} Line {line_number} Region wrap modes need the region data of a non-sliced texture info file")
+                        failed = True
+                        continue
+
+                    if wrap_u == "Wrap":
+                        wrap_u = "Repeat"
+                    if wrap_v == "Wrap":
+                        wrap_v = "Repeat"
+            
+                    texture_infos.append(TextureInfo(group_index, mesh_index, texture_name, alpha_flags, priority, draw_priority, wrap_u, wrap_v, region_u, region_v))
+                
+                    if not os.path.exists(get_texture_path(texture_infos[-1])):
+                        self.report({'WARNING'}, f"{filepath} Line {line_number} Texture {texture_name} not found")
+                        failed = True
+                        continue
+
+        if failed:
+            return {'CANCELLED'}
+
+        file_cache = self.get_file_cache(directory)
+        if self.options.deduplicate_images or self.options.geometry_source == 'NATIVE':
+            # the pngs are hashed on other threads while the geometry is loaded
+            self.image_library.prefetch({get_texture_path(texture_info) for texture_info in texture_infos}, file_cache)
+        if self.options.world_cache != 'OFF' or self.options.geometry_source == 'NATIVE':
+            # the world cache key and the fingerprints need the file hashes, wait for them one file at a time so a modal import stays responsive
+            hashed_paths = sorted({get_texture_path(texture_info) for texture_info in texture_infos})
+            if self.options.world_cache != 'OFF':
+                hashed_paths.insert(0, world_dae)
+            for path_index, path in enumerate(hashed_paths):
+                with self.profile.phase("hashes"):
+                    self.image_library.get_hash(path, file_cache)
+                yield HASH_PROGRESS * (path_index + 1) / len(hashed_paths)
+        world_cache_path = None
+        if self.options.world_cache != 'OFF':
+            cache_hit = False
+            with self.profile.phase("world_cache"):
+                world_cache_path = self.get_world_cache_path(filepath, world_dae, world_id, texture_infos, get_texture_path, file_cache)
+                if os.path.exists(world_cache_path):
+                    # an earlier import with the same files and settings was cached, use its result instead of importing again
+                    existing_objects = find_world_objects(world_id) if self.options.update_existing else []
+                    cache_hit = self.load_world_cache(world_cache_path, collection)
+                    # the earlier import is only removed once the cached world replaced it
+                    if cache_hit and existing_objects:
+                        removed_materials: set[bpy.types.Material] = set()
+                        for obj in existing_objects:
+                            remove_object_tree(obj, removed_materials)
+                        self.remove_unused_materials(removed_materials)
+            if cache_hit:
+                if file_cache is not None:
+                    file_cache.save()
+                self.report({'INFO'}, f"Imported {world_id} from {world_cache_path}: {self.profile.summary()}")
+                return {'FINISHED'}
+
+        materials_created, materials_reused = self.material_cache.created, self.material_cache.reused
+        pixels_scanned = self.cutout_detector.pixels_scanned
+        images_loaded, files_hashed, images_deduplicated = self.image_library.loaded, self.image_library.files_hashed, self.image_library.deduplicated
+        
+        if self.options.geometry_source == 'COLLADA' and "collada_import" not in dir(bpy.ops.wm):
+            self.report({'ERROR'}, "The Collada importer is not available in this version of Blender, use the native geometry source")
+            return {'CANCELLED'}
+
+        target_collection = collection
+        if self.options.staged_import:
+            # build the world in a collection that is in no view layer so changes to the new objects do not cause depsgraph updates, it is linked into the target collection at the end
+            collection = bpy.data.collections.new(f"{world_id} Staging")
+
+        try:
+            existing_objects = find_world_objects(world_id) if self.options.update_existing else []
+            # datablocks an update replaced, they are removed at the end if nothing else uses them
+            removed_materials: set[bpy.types.Material] = set()
+            replaced_images: set[bpy.types.Image] = set()
+            world = None
+            fingerprints: dict[int, dict[str, str]] | None = None
+            kept_roots: dict[int, bpy.types.Object] = {}
+            kept_meshes: dict[tuple[int, int], bpy.types.Object] = {}
+            # meshes whose geometry, texture info line, texture and importer settings did not change since the last import
+            unchanged_meshes: set[tuple[int, int]] = set()
+
+            if self.options.geometry_source == 'COLLADA':
+                with self.profile.phase("geometry"):
+                    # the collada importer always imports the whole world so an earlier import is replaced
+                    for obj in existing_objects:
+                        remove_object_tree(obj, removed_materials)
+                    pre_import_object_names = {obj.name for obj in bpy.context.scene.objects}
+                    # import the dae
+                    bpy.ops.wm.collada_import(filepath=world_dae)
+                    imported_objects: list[bpy.types.Object] = [obj for obj in bpy.context.scene.objects if obj.name not in pre_import_object_names]
+                    del pre_import_object_names
+                    # the collada importer always uses the active collection
+                    if collection != context.collection:
+                        for obj in imported_objects:
+                            collection.objects.link(obj)
+                            context.collection.objects.unlink(obj)
+            else:
+                world = yield from self.run_phase_steps("geometry", load_world_geometry_steps(world_dae, self.options.cache_geometry), HASH_PROGRESS, PARSE_PROGRESS)
+            yield PARSE_PROGRESS
+
+            if world is not None:
+                fingerprints = yield from self.run_phase_steps("fingerprints", self.fingerprint_world_steps(world, texture_infos, texture_lines, get_texture_path, file_cache), PARSE_PROGRESS, FINGERPRINT_PROGRESS)
+                with self.profile.phase("geometry"):
+                    roots = {obj[GROUP_INDEX_PROPERTY]: obj for obj in existing_objects if GROUP_INDEX_PROPERTY in obj}
+                    if existing_objects and self.options.merge_meshes == 'NONE' and len(roots) == len(existing_objects) and all(FINGERPRINTS_PROPERTY in root and root.library is None for root in roots.values()):
+                        self.material_cache.add_existing(bpy.data.materials)
+                        imported_objects, kept_roots, kept_meshes, unchanged_meshes = self.update_world_objects(world_id, world, roots, fingerprints, collection, removed_materials)
+                    else:
+                        # merged meshes can not be updated one by one so an earlier import is replaced
+                        for obj in existing_objects:
+                            remove_object_tree(obj, removed_materials)
+                        imported_objects = None
+                if imported_objects is None:
+                    # one group at a time so a modal import stays responsive
+                    imported_objects = []
+                    meshes: dict[int, bpy.types.Mesh] = {}
+                    for node_index, node in enumerate(world.nodes):
+                        with self.profile.phase("geometry"):
+                            imported_objects.extend(create_world_objects(WorldGeometry([node], world.up_axis), collection, meshes))
+                        yield FINGERPRINT_PROGRESS + (GEOMETRY_PROGRESS - FINGERPRINT_PROGRESS) * (node_index + 1) / len(world.nodes)
+
+            # index every object that came from the dae
+            with self.profile.phase("object_index"):
+                object_index = WorldObjectIndex(world_id, imported_objects)
+                object_index.roots.update(kept_roots)
+                object_index.meshes.update(kept_meshes)
+
+            missing_meshes: list[str] = []
+
+            # get the texture info
+            for texture_info_index, texture_info in enumerate(texture_infos):
+                if texture_info_index > 0:
+                    yield GEOMETRY_PROGRESS + (1 - GEOMETRY_PROGRESS) * texture_info_index / len(texture_infos)
+                if (texture_info.group_index, texture_info.mesh_index) in unchanged_meshes:
+                    self.profile.count("meshes_unchanged")
+                    continue
+                # check if texture is already in the scene
+                with self.profile.phase("images"):
+                    texture = bpy.data.textures.get(texture_info.texture_name + ".png")
+                    if texture is None:
+                        texture = bpy.data.textures.new(texture_info.texture_name + ".png", 'IMAGE')
+                    if self.options.update_existing and texture.image is not None and texture.image.get(IMAGE_HASH_PROPERTY) not in (None, self.image_library.get_hash(get_texture_path(texture_info), file_cache)):
+                        # the png changed since the image was loaded
+                        replaced_images.add(texture.image)
+                        texture.image = None
+                    if texture.image is None:
+                        if self.options.deduplicate_images:
+                            texture.image = self.image_library.load(get_texture_path(texture_info), file_cache)
+                        else:
+                            texture.image = bpy.data.images.load(get_texture_path(texture_info))
+                            if self.options.update_existing:
+                                # a later update compares the hash to find changed pngs
+                                texture.image[IMAGE_HASH_PROPERTY] = self.image_library.get_hash(get_texture_path(texture_info), file_cache)
+                            self.profile.count("images_loaded")
+                    else:
+                        self.profile.count("images_reused")
+            
+                # get the object for this texture_info
+                obj = object_index.get_mesh(texture_info.group_index, texture_info.mesh_index)
+                if obj is None:
+                    missing_meshes.append(f"{texture_info.group_index},{texture_info.mesh_index}")
+                    continue
+                mesh: bpy.types.Mesh = obj.data
+
+                if texture_info.alpha_flags != IS_OPAQUE:
+                    # push vertices out by a tiny amount to prevent z-fighting
+                    with self.profile.phase("nudge"):
+                        self.profile.count("vertices_nudged", nudge_vertices(mesh, self.options.transparent_nudge, self.options.transparent_weld_distance))
+            
+                # the material is chosen by the uv map name so make sure every mesh uses the same names
+                if len(mesh.uv_layers) > 1:
+                    mesh.uv_layers[1].name = ALPHA_UV_MAP_NAME
+                mesh.uv_layers[0].name = MAIN_UV_MAP_NAME
+
+                texture_path = get_texture_path(texture_info)
+                with self.profile.phase("uv_regions"):
+                    uv_wrap = fit_uv_wrap(mesh, texture_info, texture_path)
+                blend_method = self.resolve_blend_method(texture_info, texture.image, texture_path, file_cache)
+                material_key = repr((texture.image.name, texture_info.alpha_flags, uv_wrap.key(), self.options.material_mode, self.options.unlit_emission_strength, blend_method))
+                material = self.material_cache.get(material_key)
+                if material is None:
+                    material_name = f"{texture_info.texture_name} {texture_info.alpha_flags} {uv_wrap.wrap_u} {uv_wrap.wrap_v}"
+                    with self.profile.phase("materials"):
+                        material = self.create_material(material_name, texture_info, texture.image, blend_method, uv_wrap)
+                    self.material_cache.add(material_key, material)
+                    self.profile.count("nodes_created", len(material.node_tree.nodes))
+
+                # replace the material from the dae
+                materal_slot = obj.material_slots[0]
+                if materal_slot.material is not None and materal_slot.material != material and not self.material_cache.contains(materal_slot.material):
+                    bpy.data.materials.remove(materal_slot.material, do_unlink=True)
+                materal_slot.material = material
+
+            # tag the groups so a later import can find and update them
+            for group_index, root in object_index.roots.items():
+                root[WORLD_ID_PROPERTY] = world_id
+                root[GROUP_INDEX_PROPERTY] = group_index
+                if fingerprints is not None and self.options.merge_meshes == 'NONE':
+                    root[FINGERPRINTS_PROPERTY] = fingerprints.get(group_index, {})
+                elif FINGERPRINTS_PROPERTY in root:
+                    del root[FINGERPRINTS_PROPERTY]
+
+            if file_cache is not None:
+                file_cache.save()
+
+            if missing_meshes:
+                self.report({'WARNING'}, f"{len(missing_meshes)} texture info entries have no matching mesh in {world_dae}: {' '.join(missing_meshes)}")
+
+            merged_objects: list[bpy.types.Object] = []
+            if self.options.merge_meshes != 'NONE':
+                with self.profile.phase("merge"):
+                    merged_objects = self.merge_meshes(world_id, object_index, collection)
+
+            self.remove_unused_materials(removed_materials)
+            for image in replaced_images:
+                if image.users == 0:
+                    bpy.data.images.remove(image)
+
+            if collection != target_collection:
+                with self.profile.phase("link"):
+                    for obj in collection.objects:
+                        target_collection.objects.link(obj)
+                    bpy.data.collections.remove(collection)
+                collection = target_collection
+
+            if world_cache_path is not None:
+                with self.profile.phase("world_cache"):
+                    world_objects = list(object_index.roots.values()) + [obj for obj in merged_objects if obj.parent is None]
+                    self.write_world_cache(world_cache_path, world_id, world_objects)
+
+            self.profile.count("materials_created", self.material_cache.created - materials_created)
+            self.profile.count("materials_reused", self.material_cache.reused - materials_reused)
+            self.profile.count("pixels_scanned", self.cutout_detector.pixels_scanned - pixels_scanned)
+            self.profile.count("images_loaded", self.image_library.loaded - images_loaded)
+            self.profile.count("files_hashed", self.image_library.files_hashed - files_hashed)
+            self.profile.count("images_deduplicated", self.image_library.deduplicated - images_deduplicated)
+            self.report({'INFO'}, f"Imported {world_id}: {self.profile.summary()}")
+            if self.options.write_profile:
+                self.profile.write(os.path.join(directory, world_id + PROFILE_SUFFIX))
+    
+            return {'FINISHED'}
+        except BaseException:
+            # do not leave a half built world behind in bpy.data
+            if collection != target_collection:
+                remove_staging_collection(collection)
+            raise
+
+    def remove_unused_materials(self, materials):
+        """Removes the materials that nothing uses anymore from bpy.data and from the material cache"""
+        for material in materials:
+            if material.users == 0:
+                self.material_cache.remove(material)
+                bpy.data.materials.remove(material)
+
+    def remove_scene(self, scene: bpy.types.Scene):
+        """Removes a scene a world was imported into, its objects and the meshes, materials, textures and images only they used"""
+        objects = list(scene.collection.all_objects)
+        meshes = {obj.data for obj in objects if obj.type == 'MESH'}
+        materials = {slot.material for obj in objects for slot in obj.material_slots if slot.material is not None}
+        images = {node.image for material in materials if material.node_tree is not None for node in material.node_tree.nodes if node.type == 'TEX_IMAGE' and node.image is not None}
+        bpy.data.batch_remove(objects + [scene])
+        bpy.data.batch_remove([mesh for mesh in meshes if mesh.users == 0])
+        self.remove_unused_materials(materials)
+        # the textures only remember the image of a texture name, a later import loads the image again
+        bpy.data.batch_remove([texture for texture in bpy.data.textures if texture.users == 0 and texture.type == 'IMAGE' and texture.image in images])
+        unused_images = [image for image in images if image.users == 0]
+        for image in unused_images:
+            # a later image can get the same name
+            self.cutout_detector.results.pop(image.name, None)
+        bpy.data.batch_remove(unused_images)
+
+    def get_world_cache_directory(self) -> str:
+        return bpy.path.abspath(self.options.world_cache_directory) if self.options.world_cache_directory else bpy.utils.user_resource('DATAFILES', path=WORLD_CACHE_DIRECTORY_NAME)
+
+    def get_world_cache_path(self, filepath: str, world_dae: str, world_id: str, texture_infos: list[TextureInfo], get_texture_path, file_cache: FileInfoCache | None) -> str:
+        """Path of the cached import of a world, the name is a fingerprint of every file the import reads, the importer settings, the importer version and the blender version"""
+        texture_paths = sorted({get_texture_path(texture_info) for texture_info in texture_infos})
+        key = fingerprint(
+            hash_file(filepath),
+            self.image_library.get_hash(world_dae, file_cache),
+            *(self.image_library.get_hash(texture_path, file_cache) for texture_path in texture_paths),
+            repr(sorted(get_option_values(self.options).items())),
+            str(WORLD_CACHE_VERSION),
+            bpy.app.version_string,
+        )
+        return os.path.join(self.get_world_cache_directory(), f"{world_id}-{key}.blend")
+
+    def load_world_cache(self, path: str, collection: bpy.types.Collection) -> bool:
+        """Adds the cached world to the collection, a cache file that can not be loaded is deleted and False is returned so the world is imported normally"""
+        link = self.options.world_cache == 'LINK'
+        try:
+            with bpy.data.libraries.load(path, link=link) as (data_from, data_to):
+                data_to.collections = list(data_from.collections)
+            cache_collection = data_to.collections[0]
+        except (OSError, IndexError) as e:
+            self.report({'WARNING'}, f"Could not load the world cache {path}, importing the world instead: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return False
+        for obj in cache_collection.objects:
+            collection.objects.link(obj)
+        if not link:
+            bpy.data.collections.remove(cache_collection)
+        # the most recently used cache files are the last to be evicted
+        os.utime(path)
+        return True
+
+    def write_world_cache(self, path: str, world_id: str, world_objects: list[bpy.types.Object]):
+        cache_collection = bpy.data.collections.new(f"{world_id} Cache")
+        def link_tree(obj: bpy.types.Object):
+            cache_collection.objects.link(obj)
+            for child in obj.children:
+                link_tree(child)
+        for obj in world_objects:
+            link_tree(obj)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write next to the final path first so an interrupted write never leaves a broken cache file
+            bpy.data.libraries.write(path + ".tmp", {cache_collection}, fake_user=True)
+            os.replace(path + ".tmp", path)
+            evict_world_cache(os.path.dirname(path), self.options.world_cache_size_limit * 1024 * 1024, path)
+        except OSError as e:
+            # the cache is only an optimisation, failing to write it should not fail the import
+            self.report({'WARNING'}, f"Could not write the world cache {path}: {e}")
+        finally:
+            bpy.data.collections.remove(cache_collection)
+
+    def fingerprint_world_steps(self, world: WorldGeometry, texture_infos: list[TextureInfo], texture_lines: dict[tuple[int, int], str], get_texture_path, file_cache: FileInfoCache | None):
+        """Fingerprints of every group's transform and of every mesh's geometry, texture info line, texture file and the importer settings, yields the progress after every group and returns the fingerprints"""
+        settings = repr(sorted(get_option_values(self.options).items()))
+        texture_hashes = {(texture_info.group_index, texture_info.mesh_index): self.image_library.get_hash(get_texture_path(texture_info), file_cache) for texture_info in texture_infos}
+        fingerprints: dict[int, dict[str, str]] = {}
+        for node_index, node in enumerate(world.nodes):
+            if node_index > 0:
+                yield node_index / len(world.nodes)
+            root_name = WorldObjectIndex.parse_root_name(node.name)
+            if root_name is None:
+                continue
+            group_index = root_name[0]
+            group_fingerprints = fingerprints[group_index] = {"root": fingerprint(node.name, node.matrix)}
+            for child in node.children:
+                mesh_index = WorldObjectIndex.parse_mesh_name(child.name)
+                if mesh_index is None or child.mesh is None:
+                    continue
+                key = (group_index, mesh_index)
+                mesh = child.mesh
+                group_fingerprints[str(mesh_index)] = fingerprint(child.matrix, mesh.positions, mesh.loop_vertices, mesh.face_sizes, mesh.uvs, mesh.alpha_uvs, mesh.colours, texture_lines.get(key), texture_hashes.get(key), settings)
+        return fingerprints
+
+    def update_world_objects(self, world_id: str, world: WorldGeometry, roots: dict[int, bpy.types.Object], fingerprints: dict[int, dict[str, str]], collection: bpy.types.Collection, removed_materials: set[bpy.types.Material]) -> tuple[list[bpy.types.Object], dict[int, bpy.types.Object], dict[tuple[int, int], bpy.types.Object], set[tuple[int, int]]]:
+        """Keeps the groups and meshes of an earlier import whose fingerprints did not change and builds the rest again, returns the new group objects, the kept groups, the kept and rebuilt meshes and the indices of the unchanged meshes"""
+        mesh_name_pattern = re.compile(rf"^{re.escape(world_id)} (\d+) (\d+)$")
+        new_objects: list[bpy.types.Object] = []
+        kept_roots: dict[int, bpy.types.Object] = {}
+        meshes: dict[tuple[int, int], bpy.types.Object] = {}
+        unchanged: set[tuple[int, int]] = set()
+        for node in world.nodes:
+            root_name = WorldObjectIndex.parse_root_name(node.name)
+            group_index = None if root_name is None else root_name[0]
+            root = roots.pop(group_index, None)
+            group_fingerprints = fingerprints.get(group_index, {})
+            stored_fingerprints = root[FINGERPRINTS_PROPERTY] if root is not None else None
+            if stored_fingerprints is None or stored_fingerprints.get("root") != group_fingerprints.get("root"):
+                # new, renamed or moved groups are built again as a whole
+                if root is not None:
+                    remove_object_tree(root, removed_materials)
+                new_objects.extend(create_world_objects(WorldGeometry([node], world.up_axis), collection))
+                continue
+            kept_roots[group_index] = root
+
+            children: dict[int, bpy.types.Object] = {}
+            for child in root.children:
+                match = mesh_name_pattern.match(child.name)
+                if match is not None:
+                    children[int(match[2])] = child
+            for child_node in node.children:
+                mesh_index = WorldObjectIndex.parse_mesh_name(child_node.name)
+                if mesh_index is None or child_node.mesh is None:
+                    continue
+                obj = children.pop(mesh_index, None)
+                if obj is not None and stored_fingerprints.get(str(mesh_index)) == group_fingerprints[str(mesh_index)]:
+                    meshes[(group_index, mesh_index)] = obj
+                    unchanged.add((group_index, mesh_index))
+                    continue
+                if obj is not None:
+                    remove_object_tree(obj, removed_materials)
+                obj = bpy.data.objects.new(f"{world_id} {group_index} {mesh_index}", create_mesh(child_node.mesh))
+                obj.parent = root
+                obj.matrix_basis = Matrix(child_node.matrix.tolist())
+                collection.objects.link(obj)
+                meshes[(group_index, mesh_index)] = obj
+                self.profile.count("meshes_rebuilt")
+            # meshes that are no longer in the world
+            for obj in children.values():
+                remove_object_tree(obj, removed_materials)
+        # groups that are no longer in the world
+        for root in roots.values():
+            remove_object_tree(root, removed_materials)
+        return new_objects, kept_roots, meshes, unchanged
+
+    def merge_meshes(self, world_id: str, object_index: WorldObjectIndex, collection: bpy.types.Collection) -> list[bpy.types.Object]:
+        """Replaces the mesh objects that share a material with one object per group or per world, returns the merged objects"""
+        merged_objects: list[bpy.types.Object] = []
+        merge_groups: dict[tuple, list[tuple[int, int, bpy.types.Object, Matrix]]] = {}
+        for (group_index, mesh_index), obj in object_index.meshes.items():
+            material = obj.material_slots[0].material if len(obj.material_slots) > 0 else None
+            if material is None:
+                continue
+            local_matrix = obj.matrix_parent_inverse @ obj.matrix_basis
+            if self.options.merge_meshes == 'GROUP':
+                merge_groups.setdefault((group_index, material.name), []).append((group_index, mesh_index, obj, local_matrix))
+            else:
+                merge_groups.setdefault((None, material.name), []).append((group_index, mesh_index, obj, obj.parent.matrix_basis @ local_matrix))
+
+        for (group_index, material_name), parts in merge_groups.items():
+            if len(parts) < 2:
+                continue
+            root = object_index.get_root(group_index) if group_index is not None else None
+            name = f"{root.name if root is not None else world_id} {material_name}"
+            mesh = merge_mesh_objects(name, parts)
+            mesh.materials[0] = bpy.data.materials[material_name]
+            merged_object = bpy.data.objects.new(name, mesh)
+            merged_object.parent = root
+            if root is None:
+                merged_object[WORLD_ID_PROPERTY] = world_id
+            collection.objects.link(merged_object)
+            for part_group_index, part_mesh_index, obj, _ in parts:
+                old_mesh = obj.data
+                bpy.data.objects.remove(obj, do_unlink=True)
+                if old_mesh.users == 0:
+                    bpy.data.meshes.remove(old_mesh)
+                object_index.meshes[(part_group_index, part_mesh_index)] = merged_object
+            self.profile.count("objects_merged", len(parts))
+            merged_objects.append(merged_object)
+        return merged_objects
+
+    def resolve_blend_method(self, texture_info: TextureInfo, image: bpy.types.Image, texture_path: str, file_cache: FileInfoCache | None) -> str:
+        blend_method = 'OPAQUE'
+        if texture_info.alpha_flags == IS_OPAQUE:
+            if self.options.cutout_mode == "ALWAYS":
+                blend_method = 'CLIP'
+            elif self.options.cutout_mode == "NEVER":
+                blend_method = 'OPAQUE'
+            elif self.options.cutout_mode == "DETECT":
+                with self.profile.phase("cutout_detection"):
+                    blend_method = 'CLIP' if self.cutout_detector.is_cutout(image, texture_path, file_cache) else 'OPAQUE'
+            else:
+                raise ValueError(f"Invalid cutout mode {self.options.cutout_mode}")
+        if texture_info.alpha_flags & IS_ALPHA != 0:
+            if texture_info.alpha_flags & (IS_ALPHA_ADD | IS_ALPHA_SUBTRACT) != 0:
+                blend_method = 'BLEND'
+            else:
+                blend_method = self.options.viewport_alpha_mode
+        return blend_method
+
+    def create_material(self, name: str, texture_info: TextureInfo, image: bpy.types.Image, blend_method: str, uv_wrap: UVWrap) -> bpy.types.Material:
+        material = bpy.data.materials.new(name)
+        material.blend_method = blend_method
+        material.use_nodes = True
+        nodes = material.node_tree.nodes
+        links = material.node_tree.links
+        nodes.remove(nodes.get("Principled BSDF"))
+        self.report({'INFO'}, f"Creating material {name} for {texture_info.texture_name} {uv_wrap.wrap_u} {uv_wrap.wrap_v}")
+        # every material is the same thin wrapper around the shared node groups so eevee only compiles a handful of shader variants
+        # add uv map node
+        uv_map_node: bpy.types.ShaderNodeUVMap = nodes.new('ShaderNodeUVMap')
+        uv_map_node.label = "Main UV Map"
+        uv_map_node.uv_map = MAIN_UV_MAP_NAME
+        uv_source = uv_map_node.outputs[0]
+        # add texture node
+        texture_node: bpy.types.ShaderNodeTexImage = nodes.new('ShaderNodeTexImage')
+        texture_node.label = "Main Image Texture"
+        texture_node.image = image
+        texture_node.location = (uv_map_node.location.x + 200, uv_map_node.location.y)
+        if uv_wrap.is_region or uv_wrap.wrap_u != uv_wrap.wrap_v:
+            # wrap each axis with the shared node group, a region texture itself is never wrapped
+            region_wrap_node: bpy.types.ShaderNodeGroup = nodes.new('ShaderNodeGroup')
+            region_wrap_node.node_tree = get_region_wrap_node_group()
+            region_wrap_node.label = "Region Wrap"
+            region_wrap_node.location = (uv_map_node.location.x + 200, uv_map_node.location.y)
+            region_wrap_node.inputs["Offset"].default_value = (uv_wrap.offset[0], uv_wrap.offset[1], 0)
+            region_wrap_node.inputs["Scale"].default_value = (uv_wrap.scale[0], uv_wrap.scale[1], 1)
+            region_wrap_node.inputs["Repeat"].default_value = (uv_wrap.wrap_u == "Repeat", uv_wrap.wrap_v == "Repeat", 0)
+            links.new(uv_source, region_wrap_node.inputs["UV"])
+            uv_source = region_wrap_node.outputs[0]
+            texture_node.extension = "EXTEND" if uv_wrap.is_region else "REPEAT"
+            texture_node.location = (region_wrap_node.location.x + 200, region_wrap_node.location.y)
+        else:
+            texture_node.extension = "REPEAT" if uv_wrap.wrap_u == "Repeat" else "EXTEND"
+        links.new(uv_source, texture_node.inputs[0])
+
+        is_alpha = texture_info.alpha_flags & IS_ALPHA != 0 or blend_method == 'CLIP'
+        is_additive = is_alpha and texture_info.alpha_flags & (IS_ALPHA_ADD | IS_ALPHA_SUBTRACT) != 0
+        # subtractive materials emit negative light, lit materials can not do that so they stay additive
+        is_subtractive = is_additive and texture_info.alpha_flags & IS_ALPHA_SUBTRACT != 0 and self.options.material_mode.startswith("UNLIT")
+        surface_node: bpy.types.ShaderNodeGroup = nodes.new('ShaderNodeGroup')
+        surface_node.node_tree = get_surface_node_group()
+        surface_node.label = "KH Surface"
+        surface_node.location = (texture_node.location.x + 300, texture_node.location.y)
+        surface_node.inputs["Use Vertex Colour"].default_value = self.options.material_mode.endswith("VERTEXCOL")
+        surface_node.inputs["Lit"].default_value = not self.options.material_mode.startswith("UNLIT")
+        surface_node.inputs["Emission Strength"].default_value = -self.options.unlit_emission_strength if is_subtractive else self.options.unlit_emission_strength
+        surface_node.inputs["Use Alpha"].default_value = is_alpha
+        surface_node.inputs["Additive"].default_value = is_additive
+        links.new(texture_node.outputs[0], surface_node.inputs["Colour"])
+        links.new(texture_node.outputs[1], surface_node.inputs["Alpha"])
+
+        material_output_node: bpy.types.ShaderNodeOutputMaterial = nodes.get("Material Output")
+        material_output_node.location = (surface_node.location.x + 200, surface_node.location.y)
+        links.new(surface_node.outputs[0], material_output_node.inputs[0])
+
+        if material.blend_method == "BLEND":
+            material.shadow_method = "HASHED"
+        else:
+            material.shadow_method = material.blend_method
+        return material
+
+class DataSnapshot:
+    """Remembers which datablocks exist so everything created afterwards can be removed again"""
+    DATA_COLLECTIONS = ("objects", "meshes", "materials", "textures", "images", "node_groups", "collections")
+
+    def __init__(self):
+        self.existing = {name: set(getattr(bpy.data, name)) for name in self.DATA_COLLECTIONS}
+
+    def remove_new(self) -> int:
+        new_data = [data for name in self.DATA_COLLECTIONS for data in getattr(bpy.data, name) if data not in self.existing[name]]
+        bpy.data.batch_remove(new_data)
+        return len(new_data)
 
 class ImportKHWorld(Operator, ImportHelper):
-    """Import a Kingdom Hearts World from a preSliced-texture-info.txt file and a world.dae file"""
+    """Import a Kingdom Hearts World from a preSliced-texture-info.txt or texture-info.txt file and a world.dae file"""
     bl_idname = "import_scene.kh_export"  # important since its how bpy.ops.import_scene.kh_export is constructed
     bl_label = "KH World"
+    bl_options = {'REGISTER', 'UNDO'}
 
     # ImportHelper mixin class uses this
     filename_ext = ".txt"
@@ -83,10 +1660,22 @@ class ImportKHWorld(Operator, ImportHelper):
         description="Set blendmode of cutout materials to CLIP",
         items=(
             ('ALWAYS', "Always", "Always set cutout materials to CLIP"),
-            ('DETECT', "Detect", "Detect if the texture is cutout and set the blendmode to CLIP if it is (this is very expensive)"),
+            ('DETECT', "Detect", "Detect if the texture is cutout and set the blendmode to CLIP if it is"),
             ('NEVER', "Never", "Never set cutout materials to CLIP")
         ),
-        default='ALWAYS',
+        default='DETECT',
+    )
+
+    cache_texture_info: bpy.props.BoolProperty(
+        name="Cache Texture Info",
+        description=f"Remember which textures are cutout and the hash of their contents in a {IMPORT_CACHE_FILE_NAME} file next to the textures so later imports do not need to read them again",
+        default=True,
+    )
+
+    deduplicate_images: bpy.props.BoolProperty(
+        name="Deduplicate Images",
+        description="Load textures with identical file contents only once and share the image between them, also reuses images from earlier imports",
+        default=True,
     )
 
     transparent_nudge: bpy.props.FloatProperty(
@@ -97,323 +1686,280 @@ class ImportKHWorld(Operator, ImportHelper):
         max=1
     )
 
+    transparent_weld_distance: bpy.props.FloatProperty(
+        name="Nudge Weld Distance",
+        description="Vertices of transparent meshes within this distance of each other are treated as one position when averaging nudge normals, 0 only groups exactly coincident vertices. Welding is slower on meshes with many vertices",
+        default=0.0,
+        min=0.0,
+        max=1
+    )
+
+    geometry_source: bpy.props.EnumProperty(
+        name="Geometry Source",
+        description="How the meshes in the world.dae file are loaded",
+        items=(
+            ('NATIVE', "Native", "Read the dae directly and build the meshes in bulk"),
+            ('COLLADA', "Collada Importer", "Use Blender's Collada importer, this is slower and not available in newer versions of Blender")
+        ),
+        default='NATIVE',
+    )
+
+    cache_geometry: bpy.props.BoolProperty(
+        name="Cache Geometry",
+        description=f"Store the geometry read by the native loader in a <world>-world{GEOMETRY_CACHE_SUFFIX} file next to the dae so later imports do not need to parse it again",
+        default=True,
+    )
+
+    update_existing: bpy.props.BoolProperty(
+        name="Update Existing World",
+        description="If the world was imported into this file before, only rebuild the groups, meshes, materials and images whose geometry, texture info line, png or importer settings changed since then and keep everything else as it is. Without the native geometry source or with merged meshes the earlier import is replaced instead",
+        default=False,
+    )
+
+    merge_meshes: bpy.props.EnumProperty(
+        name="Merge Meshes",
+        description="Join the meshes that use the same material into one object to reduce the object count, the original group and mesh index of each face is kept in the kh_group_index and kh_mesh_index attributes",
+        items=(
+            ('NONE', "None", "Keep one object per mesh"),
+            ('GROUP', "Per Group", "Merge the meshes of each mesh group or BOB"),
+            ('WORLD', "Whole World", "Merge the meshes of every group into one object per material")
+        ),
+        default='NONE',
+    )
+
+    staged_import: bpy.props.BoolProperty(
+        name="Staged Import",
+        description="Build the world in a temporary collection outside the scene and link the finished objects into the scene in one step, this avoids viewport and depsgraph updates while the world is built. The Collada geometry source still imports into the scene first so this mostly helps the native geometry source",
+        default=True,
+    )
+
+    world_cache: bpy.props.EnumProperty(
+        name="World Cache",
+        description="Save every imported world to a .blend file in the world cache directory, later imports of the same files with the same settings use the cached result instead of importing again",
+        items=(
+            ('OFF', "Off", "Always import the world"),
+            ('APPEND', "Append", "Append cached worlds, the result is the same as a normal import"),
+            ('LINK', "Link", "Link cached worlds from the cache file, this keeps working files small but the world can not be edited and breaks when its cache file is evicted")
+        ),
+        default='OFF',
+    )
+
+    world_cache_directory: bpy.props.StringProperty(
+        name="World Cache Directory",
+        description=f"Directory of the world cache, empty uses {WORLD_CACHE_DIRECTORY_NAME} in Blender's user datafiles directory",
+        default="",
+        subtype='DIR_PATH',
+    )
+
+    world_cache_size_limit: bpy.props.IntProperty(
+        name="World Cache Size (MB)",
+        description="The least recently used cached worlds are removed when the cache gets bigger than this",
+        default=2048,
+        min=0,
+    )
+
+    use_modal: bpy.props.BoolProperty(
+        name="Cancellable Import",
+        description="Import in small steps while Blender keeps redrawing and show the progress in the status bar, Esc cancels the import and removes everything it created so far. Groups and meshes an update has already replaced are not restored. The Collada geometry source and loading a cached world still run in one step",
+        default=False,
+    )
+
+    write_profile: bpy.props.BoolProperty(
+        name="Write Profile",
+        description=f"Write the time spent in each import phase and counters of the work done to a <world>{PROFILE_SUFFIX} file next to the imported world",
+        default=False,
+    )
+
     def execute(self, context: bpy.types.Context):
-        directory = os.path.dirname(self.filepath)
-        world_id = os.path.basename(self.filepath)[:-len("-preSliced-texture-info.txt")]
-        world_dae = os.path.join(directory, world_id + "-world.dae")
-        if not os.path.exists(world_dae):
-            self.report({'ERROR'}, f"DAE file {world_dae} not found")
+        importer = WorldImporter(self, self.report)
+        if not self.use_modal or bpy.app.background:
+            return importer.import_world(context, self.filepath, context.collection)
+
+        self._snapshot = DataSnapshot()
+        self._steps = importer.import_world_steps(context, self.filepath, context.collection)
+        window_manager = context.window_manager
+        self._timer = window_manager.event_timer_add(0.01, window=context.window)
+        window_manager.modal_handler_add(self)
+        window_manager.progress_begin(0, 100)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context: bpy.types.Context, event: bpy.types.Event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self.cancel(context)
+            self.report({'WARNING'}, f"Import of {self.filepath} cancelled")
             return {'CANCELLED'}
-    
-        texture_infos: [TextureInfo] = []
+        if event.type != 'TIMER':
+            # block other input so the scene is not edited halfway through the import
+            return {'RUNNING_MODAL'}
 
-        failed = False
+        try:
+            progress = 0.0
+            deadline = time.perf_counter() + MODAL_STEP_SECONDS
+            while time.perf_counter() < deadline:
+                progress = next(self._steps)
+            context.window_manager.progress_update(progress * 100)
+            context.workspace.status_text_set(f"Importing {os.path.basename(self.filepath)}: {progress:.0%}, press Esc to cancel")
+        except StopIteration as stop:
+            self.end_modal(context)
+            if 'FINISHED' not in stop.value:
+                self._snapshot.remove_new()
+            return stop.value
+        except BaseException:
+            self.cancel(context)
+            raise
+        return {'RUNNING_MODAL'}
 
-        def get_texture_path(texture: TextureInfo):
-            return os.path.join(directory, texture.texture_name + ".png")
+    def cancel(self, context: bpy.types.Context):
+        try:
+            self._steps.close()
+            self._snapshot.remove_new()
+        finally:
+            self.end_modal(context)
 
-        # parse the file
-        with open(self.filepath, "r") as f:
-            line_number = 0
-            for line in f.readlines():
-                line_number += 1
-
-                mesh_info, texture_name, alpha_flags, priority, draw_priority, wrap_mode_info = line.split(":")
-                alpha_flags, priority, draw_priority = int(alpha_flags), int(priority), int(draw_priority)
-                group_index, mesh_index = mesh_info.split(",")
-                group_index, mesh_index = int(group_index), int(mesh_index)
-                wrap_u, wrap_v = wrap_mode_info.split(",")
-                wrap_u, wrap_v = wrap_u.strip(), wrap_v.strip()
-
-                if "Region" in wrap_u or "Region" in wrap_v:
-                    self.report({'WARNING'}, f"{self.filepath} Line {line_number} Region wrap modes are not supported")
-                    failed = True
-                    continue
+    def end_modal(self, context: bpy.types.Context):
+        if self._timer is None:
+            return
+        context.window_manager.event_timer_remove(self._timer)
+        self._timer = None
+        context.window_manager.progress_end()
+        context.workspace.status_text_set(None)
 
-                if wrap_u == "Wrap":
-                    wrap_u = "Repeat"
-                if wrap_v == "Wrap":
-                    wrap_v = "Repeat"
-            
-                texture_infos.append(TextureInfo(group_index, mesh_index, texture_name, alpha_flags, priority, draw_priority, wrap_u, wrap_v))
-                
-                if not os.path.exists(get_texture_path(texture_infos[-1])):
-                    self.report({'WARNING'}, f"{self.filepath} Line {line_number} Texture {texture_name} not found")
-                    failed = True
-                    continue
+class ImportKHWorldNoUndo(ImportKHWorld):
+    """Import a Kingdom Hearts World without an undo step, big worlds make big undo steps so this saves memory but the import can not be undone"""
+    bl_idname = "import_scene.kh_export_no_undo"
+    bl_label = "KH World (No Undo)"
+    bl_options = {'REGISTER'}
 
-        if failed:
-            return {'CANCELLED'}
-        
-        pre_import_root_objs_list: list[bpy.types.Object] = [obj for obj in bpy.context.scene.objects if obj.parent is None]
-        # import the dae
-        bpy.ops.wm.collada_import(filepath=world_dae)
-        
-        # get list of all objects in root of the dae
-        kh_world_root_objects: list[bpy.types.Object] = [obj for obj in bpy.context.scene.objects if obj.parent is None and obj not in pre_import_root_objs_list]
-        del pre_import_root_objs_list
-
-        root_objs_by_group_index: dict[int, bpy.types.Object] = {}
-        mesh_objs_by_group_index: dict[int, dict[int, bpy.types.Object]] = {}
-
-        def get_root_obj(group_index: int) -> bpy.types.Object:
-            if group_index in root_objs_by_group_index:
-                return root_objs_by_group_index[group_index]
-            for obj in kh_world_root_objects:
-                split = obj.name.split(" ")
-                if split[0] == f"{group_index}":
-                    obj.name = f"{world_id} {group_index} {'Mesh Group' if split[1] == 'Mesh' else 'BOB'}"
-                    obj.scale = (0.01, 0.01, 0.01)
-                    obj.location *= 0.01
-                    root_objs_by_group_index[group_index] = obj
-                    return obj
-            raise ValueError(f"Group {group_index} not found")
-        
-        def get_mesh(group_index, mesh_index) -> bpy.types.Object:
-            if group_index in mesh_objs_by_group_index:
-                if mesh_index in mesh_objs_by_group_index[group_index]:
-                    return mesh_objs_by_group_index[group_index][mesh_index]
-            else:
-                mesh_objs_by_group_index[group_index] = {}
-            for child in get_root_obj(group_index).children:
-                if child.name.startswith(f"Group {group_index} Mesh {mesh_index}") or (child.name.startswith("BOB") and f"Mesh {mesh_index}" in child.name):
-                    child.name = f"{world_id} {group_index} {mesh_index}"
-                    mesh_objs_by_group_index[group_index][mesh_index] = child
-                    return child
-            raise ValueError(f"Mesh {mesh_index} not found in group {group_index}")
-
-        # get the texture info
-        for texture_info in texture_infos:
-            # check if texture is already in the scene
-            texture = bpy.data.textures.get(texture_info.texture_name + ".png")
-            if texture is None:
-                texture = bpy.data.textures.new(texture_info.texture_name + ".png", 'IMAGE')
-                texture.image = bpy.data.images.load(get_texture_path(texture_info))
-            elif texture.image is None:
-                texture.image = bpy.data.images.load(get_texture_path(texture_info))
-            
-            # get the object for this texture_info
-            obj = get_mesh(texture_info.group_index, texture_info.mesh_index)
-            mesh: bpy.types.Mesh = obj.data
-
-            if texture_info.alpha_flags != IS_OPAQUE:
-                # push vertices out by a tiny amount to prevent z-fighting
-                pos_to_normals = {}
-                def pos_str(pos):
-                    return f"{pos[0]} {pos[1]} {pos[2]}"
-                for vert in mesh.vertices:
-                    if pos_str(vert.co) in pos_to_normals:
-                        pos_to_normals[pos_str(vert.co)].append(np.array(vert.normal.normalized()))
-                    else:
-                        pos_to_normals[pos_str(vert.co)] = [np.array(vert.normal.normalized())]
-                # get the average normal for each position
-                for pos, normals in pos_to_normals.items():
-                    normals = np.linalg.norm(np.sum(normals))
-                    pos_to_normals[pos] = normals
-                for vert in mesh.vertices:
-                     pos = np.array(vert.co)
-                     vert.co = pos + pos_to_normals[pos_str(vert.co)] * self.transparent_nudge
-            
-            # get the material from the object
-            materal_slot = obj.material_slots[0]
-            material = materal_slot.material
 
-            if material is not None:
-                # delete this material
-                bpy.data.materials.remove(material, do_unlink=True)
-            
-            # create a new material
-            material_name = f"{texture_info.group_index} {texture_info.mesh_index} {texture_info.texture_name} {texture_info.alpha_flags} {texture_info.wrap_u} {texture_info.wrap_v}"
-            if material_name in bpy.data.materials:
-                raise ValueError(f"Material {material_name} already exists")
-            else:
-                materal_slot.material = material = bpy.data.materials.new(material_name)
-                material.use_nodes = True
-                material.node_tree.nodes.remove(material.node_tree.nodes.get("Principled BSDF"))
-                # add uv map node
-                uv2_map_node: bpy.types.ShaderNodeUVMap = material.node_tree.nodes.new('ShaderNodeUVMap')
-                uv2_map_node.label = "Main UV Map"
-                uv2_map_node.uv_map = mesh.uv_layers[0].name
-                # add texture node
-                texture_node: bpy.types.ShaderNodeTexImage = material.node_tree.nodes.new('ShaderNodeTexImage')
-                uv2_map_node.label = "Main Image Texture"
-                texture_node.image = texture.image
-                self.report({'INFO'}, f"Creating material {material_name} for {texture_info.texture_name} {texture_info.wrap_u} {texture_info.wrap_v}")
-                material_output_node: bpy.types.ShaderNodeOutputMaterial = material.node_tree.nodes.get("Material Output")
-                if texture_info.wrap_u == texture_info.wrap_v:
-                    texture_node.extension = "REPEAT" if texture_info.wrap_u == "Repeat" else "EXTEND"
-                    texture_node.location = (uv2_map_node.location.x + 200, uv2_map_node.location.y)
-                    material.node_tree.links.new(uv2_map_node.outputs[0], texture_node.inputs[0])
-                else:
-                    # split the uv into u and v using separate xyz
-                    uv2_split_node: bpy.types.ShaderNodeSeparateXYZ = material.node_tree.nodes.new('ShaderNodeSeparateXYZ')
-                    uv2_split_node.label = "UV Split"
-                    uv2_split_node.location = (uv2_map_node.location.x + 200, uv2_map_node.location.y)
-                    material.node_tree.links.new(uv2_map_node.outputs[0], uv2_split_node.inputs[0])
-                    uv_combine_node: bpy.types.ShaderNodeCombineXYZ = material.node_tree.nodes.new('ShaderNodeCombineXYZ')
-                    uv_combine_node.label = "UV Combine"
-                    uv_combine_node.location = (uv2_map_node.location.x + 600, uv2_map_node.location.y)
-                    def do_tex_mode(idx: int, wrap_name: str):
-                        if wrap_name == "Repeat":
-                            material.node_tree.links.new(uv2_split_node.outputs[idx], uv_combine_node.inputs[idx])
-                        else:
-                            # clamp the uv to 0-1
-                            clamp_node: bpy.types.ShaderNodeClamp = material.node_tree.nodes.new('ShaderNodeClamp')
-                            clamp_node.label = "Clamp UV Component"
-                            clamp_node.inputs[1].default_value = 0
-                            clamp_node.inputs[2].default_value = 1
-                            clamp_node.location = (uv2_map_node.location.x + 400, uv2_map_node.location.y - idx * 100)
-                            material.node_tree.links.new(uv2_split_node.outputs[idx], clamp_node.inputs[0])
-                            material.node_tree.links.new(clamp_node.outputs[0], uv_combine_node.inputs[idx])
-                    
-                    do_tex_mode(0, texture_info.wrap_u)
-                    do_tex_mode(1, texture_info.wrap_v)
-                        
-                    texture_node.extension = "REPEAT"
-
-                colour_source = texture_node.outputs[0]
-                alpha_source = texture_node.outputs[1]
-
-                if self.material_mode.endswith("VERTEXCOL"):
-                    # add vertex colour node
-                    vertex_colour_node: bpy.types.ShaderNode = material.node_tree.nodes.new('ShaderNodeVertexColor')
-                    vertex_colour_node.label = "Vertex Colour RGB"
-                    vertex_colour_node.location = (texture_node.location.x - 200, texture_node.location.y + 200)
-                    # power of 2.2 for gamma correction
-                    gamma_node: bpy.types.ShaderNodeMath = material.node_tree.nodes.new('ShaderNodeMath')
-                    gamma_node.label = "Gamma Correction"
-                    gamma_node.operation = 'POWER'
-                    gamma_node.inputs[1].default_value = 2.2
-                    gamma_node.location = (vertex_colour_node.location.x + 200, vertex_colour_node.location.y)
-                    material.node_tree.links.new(vertex_colour_node.outputs[0], gamma_node.inputs[0])
-                    # multiply the vertex colour with the texture colour
-                    colour_multiply_node: bpy.types.ShaderNodeMixRGB = material.node_tree.nodes.new('ShaderNodeMixRGB')
-                    colour_multiply_node.label = "Vertex Colour Multiply"
-                    colour_multiply_node.blend_type = 'MULTIPLY'
-                    colour_multiply_node.location = (vertex_colour_node.location.x + 200, vertex_colour_node.location.y)
-                    # set factor to 1
-                    colour_multiply_node.inputs[0].default_value = 1
-                    material.node_tree.links.new(vertex_colour_node.outputs[0], colour_multiply_node.inputs[1])
-                    material.node_tree.links.new(colour_source, colour_multiply_node.inputs[2])
-                    colour_source = colour_multiply_node.outputs[0]
-
-                    # add second uv map node (alpha is stored in the second uv map's x coordinate)
-                    uv2_map_node: bpy.types.ShaderNodeUVMap = material.node_tree.nodes.new('ShaderNodeUVMap')
-                    uv2_map_node.label = "Alpha UV Map"
-                    uv2_map_node.uv_map = mesh.uv_layers[1].name
-                    uv2_map_node.location = (texture_node.location.x - 200, texture_node.location.y + 400)
-                    # split the uv into u and v using separate xyz
-                    uv2_split_node: bpy.types.ShaderNodeSeparateXYZ = material.node_tree.nodes.new('ShaderNodeSeparateXYZ')
-                    uv2_split_node.label = "Alpha UV Split"
-                    uv2_split_node.location = (uv2_map_node.location.x + 200, uv2_map_node.location.y)
-                    material.node_tree.links.new(uv2_map_node.outputs[0], uv2_split_node.inputs[0])
-                    # multiply the alpha with the vertex colour alpha
-                    alpha_multiply_node: bpy.types.ShaderNodeMath = material.node_tree.nodes.new('ShaderNodeMath')
-                    alpha_multiply_node.label = "Vertex Alpha Multiply"
-                    alpha_multiply_node.operation = 'MULTIPLY'
-                    alpha_multiply_node.location = (uv2_split_node.location.x + 200, uv2_split_node.location.y)
-                    material.node_tree.links.new(uv2_split_node.outputs[0], alpha_multiply_node.inputs[0])
-                    material.node_tree.links.new(alpha_source, alpha_multiply_node.inputs[1])
-
-
-                    alpha_source = alpha_multiply_node.outputs[0]
-
-
-
-                if self.material_mode.startswith("UNLIT"):
-                    main_shader_node: bpy.types.ShaderNodeEmission = material.node_tree.nodes.new('ShaderNodeEmission')
-                    main_shader_node.location = (texture_node.location.x + 200, texture_node.location.y)
-                    # set emission strength to 1
-                    main_shader_node.inputs[1].default_value = self.unlit_emission_strength
-                    material.node_tree.links.new(colour_source, main_shader_node.inputs[0])
-                else:
-                    main_shader_node: bpy.types.ShaderNodeBsdfDiffuse = material.node_tree.nodes.new('ShaderNodeBsdfDiffuse')
-                    main_shader_node.location = (texture_node.location.x + 200, texture_node.location.y)
-                    material.node_tree.links.new(colour_source, main_shader_node.inputs[0])
-                if texture_info.alpha_flags == IS_OPAQUE:
-                    if self.cutout_mode == "ALWAYS":
-                        material.blend_method = 'CLIP'
-                    elif self.cutout_mode == "NEVER":
-                        material.blend_method = 'OPAQUE'
-                    elif self.cutout_mode == "DETECT":
-                        if texture.image.channels == 3:
-                            material.blend_method = 'OPAQUE'
-                        elif texture.image.channels == 4:
-                            # check if the texture has any data in the alpha channel
-                            pixels = texture.image.pixels
-                            for i in range(3, len(pixels), 4):
-                                if pixels[i] < 1:
-                                    material.blend_method = 'CLIP'
-                                    break
-                            else:
-                                material.blend_method = 'OPAQUE'
-                        else:
-                            raise ValueError(f"Texture {texture_info.texture_name} has an invalid number of channels")
-                    else:
-                        raise ValueError(f"Invalid cutout mode {self.cutout_mode}")
-                is_alpha = texture_info.alpha_flags & IS_ALPHA != 0
-                if is_alpha or material.blend_method == 'CLIP':
-                    if is_alpha:
-                        material.blend_method = self.viewport_alpha_mode
-                    
-                    is_additive = texture_info.alpha_flags & IS_ALPHA_ADD != 0
-                    is_subtractive = texture_info.alpha_flags & IS_ALPHA_SUBTRACT != 0
-
-                    transparent_shader_node: bpy.types.ShaderNodeBsdfTransparent = material.node_tree.nodes.new('ShaderNodeBsdfTransparent')
-                    # white color for the transparent shader, this means the transparent shader will be fully transparent
-                    transparent_shader_node.inputs[0].default_value = [1, 1, 1, 1]
-                    transparent_shader_node.location = (main_shader_node.location.x, main_shader_node.location.y - 200)
-
-                    if is_additive or is_subtractive:
-                        material.blend_method = 'BLEND'
-                        if is_subtractive and self.material_mode.startswith("UNLIT"):
-                            negative_emission_strength_node: bpy.types.ShaderNodeValue = material.node_tree.nodes.new('ShaderNodeValue')
-                            negative_emission_strength_node.label = "Negative Emission Strength"
-                            negative_emission_strength_node.outputs[0].default_value = -self.unlit_emission_strength
-                            negative_emission_strength_node.location = (main_shader_node.location.x + 200, main_shader_node.location.y)
-                            add_shader_node: bpy.types.ShaderNodeMath = material.node_tree.nodes.new('ShaderNodeMath')
-                        add_shader_node: bpy.types.ShaderNodeAddShader = material.node_tree.nodes.new('ShaderNodeAddShader')
-                        add_shader_node.location = (main_shader_node.location.x + 200, main_shader_node.location.y)
-                        material_output_node.location = (add_shader_node.location.x + 200, add_shader_node.location.y)
-
-                        material.node_tree.links.new(transparent_shader_node.outputs[0], add_shader_node.inputs[0])
-                        material.node_tree.links.new(main_shader_node.outputs[0], add_shader_node.inputs[1])
-                        material.node_tree.links.new(add_shader_node.outputs[0], material_output_node.inputs[0])
-                    else:
-                        mix_shader_node: bpy.types.ShaderNodeMixShader = material.node_tree.nodes.new('ShaderNodeMixShader')
-                        mix_shader_node.location = (main_shader_node.location.x + 200, main_shader_node.location.y)
-                        material_output_node.location = (mix_shader_node.location.x + 200, mix_shader_node.location.y)
+def default_import_options() -> types.SimpleNamespace:
+    """The default ImportKHWorld settings as a plain object that WorldImporter accepts"""
+    return types.SimpleNamespace(**{name: prop.keywords["default"] for name, prop in ImportKHWorld.__annotations__.items() if name != "filter_glob"})
 
-                        material.node_tree.links.new(alpha_source, mix_shader_node.inputs[0])
-                        material.node_tree.links.new(transparent_shader_node.outputs[0], mix_shader_node.inputs[1])
-                        material.node_tree.links.new(main_shader_node.outputs[0], mix_shader_node.inputs[2])
-                        material.node_tree.links.new(mix_shader_node.outputs[0], material_output_node.inputs[0])
+def find_worlds(directory: str) -> list[str]:
+    """Returns the texture info file of every exported world in the directory that also has its world dae"""
+    texture_info_paths: dict[str, str] = {}
+    for file_name in sorted(os.listdir(directory)):
+        world_id = get_world_id(file_name)
+        if world_id is None or not os.path.exists(os.path.join(directory, world_id + WORLD_DAE_SUFFIX)):
+            continue
+        path = os.path.join(directory, file_name)
+        # both exports write the same texture names, so if a world has both files the newest one matches the textures
+        if world_id not in texture_info_paths or os.path.getmtime(path) > os.path.getmtime(texture_info_paths[world_id]):
+            texture_info_paths[world_id] = path
+    return [texture_info_paths[world_id] for world_id in sorted(texture_info_paths)]
 
-            if material.blend_method == "BLEND":
-                material.shadow_method = "HASHED"
-            else:
-                material.shadow_method = material.blend_method
-    
-        return {'FINISHED'}
+def import_world_directory(directory: str, options=None, output_directory: str | None = None, summary_path: str | None = None) -> dict:
+    """Imports every world in a directory into the current scene, or into one .blend file per world if output_directory is set, returns a summary of the results"""
+    if options is None:
+        options = default_import_options()
+    if output_directory is not None:
+        os.makedirs(output_directory, exist_ok=True)
+
+    summary = {"directory": os.path.abspath(directory), "worlds": []}
+    world_summary: dict = {}
+    def report(level: set[str], message: str):
+        print(f"{'/'.join(sorted(level))}: {message}")
+        if 'ERROR' in level:
+            world_summary["errors"].append(message)
+        elif 'WARNING' in level:
+            world_summary["warnings"].append(message)
+
+    # one importer for every world so materials and cutout results are shared
+    importer = WorldImporter(options, report)
+    start_time = time.perf_counter()
+    for texture_info_path in find_worlds(directory):
+        world_id = get_world_id(texture_info_path)
+        world_summary = {"world": world_id, "texture_info": texture_info_path, "status": 'FAILED', "warnings": [], "errors": []}
+        summary["worlds"].append(world_summary)
+        world_start_time = time.perf_counter()
+        if output_directory is None:
+            scene = bpy.context.scene
+            collection = bpy.context.collection
+        else:
+            scene = bpy.data.scenes.new(world_id)
+            collection = scene.collection
+        try:
+            result = importer.import_world(bpy.context, texture_info_path, collection)
+            world_summary["status"] = 'FINISHED' if 'FINISHED' in result else 'CANCELLED'
+            if output_directory is not None and world_summary["status"] == 'FINISHED':
+                world_summary["output"] = os.path.join(os.path.abspath(output_directory), world_id + ".blend")
+                bpy.data.libraries.write(world_summary["output"], {scene}, path_remap='ABSOLUTE')
+        except Exception as e:
+            traceback.print_exc()
+            world_summary["errors"].append(f"{type(e).__name__}: {e}")
+        if output_directory is not None:
+            # the world is in its own file now, free it so memory does not grow with every world
+            importer.remove_scene(scene)
+        world_summary["seconds"] = time.perf_counter() - world_start_time
+        world_summary["profile"] = importer.profile.to_dict()
+        print(f"{world_id}: {world_summary['status']} in {world_summary['seconds']:.2f}s")
+
+    for file_cache in importer.file_caches.values():
+        file_cache.save()
+    summary["seconds"] = time.perf_counter() - start_time
+    summary["succeeded"] = sum(1 for world_summary in summary["worlds"] if world_summary["status"] == 'FINISHED')
+    summary["failed"] = len(summary["worlds"]) - summary["succeeded"]
+    if summary_path is not None:
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
 
+def main(argv: list[str]) -> int:
+    """Command line entry point, blender -b --python "Blender Importer.py" -- <directory> [options]"""
+    parser = argparse.ArgumentParser(prog='blender -b --python "Blender Importer.py" --', description="Import every exported KH world in a directory")
+    parser.add_argument("directory", help="directory containing the exported worlds")
+    parser.add_argument("--output", help="write one .blend file per world into this directory instead of importing every world into one scene")
+    parser.add_argument("--blend", help="save the file containing every imported world here")
+    parser.add_argument("--summary", help="write a json summary of the results and timings here")
+    # every operator setting is also a command line option
+    options = default_import_options()
+    for name, prop in ImportKHWorld.__annotations__.items():
+        if name == "filter_glob":
+            continue
+        flag = "--" + name.replace("_", "-")
+        help_text = prop.keywords.get("description")
+        if prop.function is bpy.props.EnumProperty:
+            parser.add_argument(flag, dest=name, choices=[item[0] for item in prop.keywords["items"]], default=getattr(options, name), help=help_text)
+        elif prop.function is bpy.props.BoolProperty:
+            parser.add_argument(flag, dest=name, type=lambda value: value.lower() in ("1", "true", "yes", "on"), default=getattr(options, name), help=help_text)
+        elif prop.function is bpy.props.FloatProperty:
+            parser.add_argument(flag, dest=name, type=float, default=getattr(options, name), help=help_text)
+        elif prop.function is bpy.props.IntProperty:
+            parser.add_argument(flag, dest=name, type=int, default=getattr(options, name), help=help_text)
+        else:
+            parser.add_argument(flag, dest=name, default=getattr(options, name), help=help_text)
+    args = parser.parse_args(argv)
+    for name in vars(options):
+        setattr(options, name, getattr(args, name))
 
+    summary = import_world_directory(args.directory, options, args.output, args.summary)
+    if args.blend is not None:
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.blend))
+    print(f"Imported {summary['succeeded']} of {len(summary['worlds'])} worlds in {summary['seconds']:.2f}s")
+    return 0 if summary["failed"] == 0 else 1
 
 
 # Only needed if you want to add into a dynamic menu.
 def menu_func_import(self, context):
     self.layout.operator(ImportKHWorld.bl_idname, text="KH World")
+    self.layout.operator(ImportKHWorldNoUndo.bl_idname, text="KH World (No Undo)")
 
 
 # Register and add to the "file selector" menu (required to use F3 search "Import KH World" for quick access).
 def register():
     bpy.utils.register_class(ImportKHWorld)
+    bpy.utils.register_class(ImportKHWorldNoUndo)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
 
 
 def unregister():
+    bpy.utils.unregister_class(ImportKHWorldNoUndo)
     bpy.utils.unregister_class(ImportKHWorld)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
 
 
 if __name__ == "__main__":
+    # arguments after -- mean the script is being run from the command line as a batch importer
+    if "--" in sys.argv:
+        sys.exit(main(sys.argv[sys.argv.index("--") + 1:]))
     register()
\ No newline at end of file